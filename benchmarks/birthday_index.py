@@ -0,0 +1,96 @@
+"""
+Бенчмарк запросов find_birthday до и после перехода на MMDD-выражение с индексом (migrations/003):
+прежние условия TO_CHAR(...)/EXTRACT(...) без индекса против текущих условий DbQueryParser с индексом.
+Печатает время выполнения и типы сканирования из EXPLAIN ANALYZE.
+Запуск: `python -m benchmarks.birthday_index --dsn "dbname=bench host=localhost" --size 100000`.
+"""
+import argparse
+import datetime
+import os
+import random
+import statistics
+from pathlib import Path
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from benchmarks.name_search import node_types
+from interesch import DbQueryParser
+
+SCHEMA = "bench_birthday_index"
+MIGRATION = Path(__file__).resolve().parent.parent / "migrations" / "003_birthday_month_day_index.sql"
+
+BASELINE_HEAD = ('SELECT \'BirthdayList\', emp."Surname", emp."Name", emp."Father", emp."Birthday", '
+                 'dprt."Name" AS "department_name" FROM "Employees" as emp '
+                 'LEFT JOIN "Department" as dprt ON dprt."Department_Id" = emp."DepartmentId" WHERE ')
+BASELINE_TAIL = (' ORDER BY EXTRACT(MONTH FROM emp."Birthday"), EXTRACT(DAY FROM emp."Birthday"), '
+                 'emp."Surname", emp."Name" LIMIT 10')
+BASELINE_WHERE = {
+    "сегодня": "TO_CHAR(emp.\"Birthday\", 'MM-DD') = TO_CHAR(CURRENT_DATE, 'MM-DD')",
+    "завтра": "TO_CHAR(emp.\"Birthday\", 'MM-DD') = TO_CHAR(CURRENT_DATE + INTERVAL '1 day', 'MM-DD')",
+    "20 мая": 'EXTRACT(MONTH FROM emp."Birthday") = 5 AND EXTRACT(DAY FROM emp."Birthday") = 20',
+    "июнь": 'EXTRACT(MONTH FROM emp."Birthday") = 6',
+    "зимой": 'EXTRACT(MONTH FROM emp."Birthday") IN (12, 1, 2)',
+}
+
+SCHEMA_SQL = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+SET search_path TO {SCHEMA}, public;
+CREATE TABLE "Department" ("Department_Id" serial PRIMARY KEY, "Name" text);
+CREATE TABLE "Employees" (
+    "Employee_Id" serial PRIMARY KEY, "Name" text, "Surname" text, "Father" text,
+    "Birthday" date, "DepartmentId" int
+);
+"""
+
+
+def seed(cursor, size: int, rng: random.Random):
+    execute_values(cursor, 'INSERT INTO "Department" ("Name") VALUES %s', [(f"Отдел {i}",) for i in range(20)])
+    start = datetime.date(1960, 1, 1)
+    rows = [(f"Имя{i % 500}", f"Фамилия{i}", None, start + datetime.timedelta(days=rng.randrange(365 * 45)),
+             rng.randint(1, 20)) for i in range(size)]
+    execute_values(cursor, 'INSERT INTO "Employees" ("Name", "Surname", "Father", "Birthday", "DepartmentId") '
+                           'VALUES %s', rows, page_size=5000)
+    cursor.execute('ANALYZE "Employees"')
+
+
+def explain(cursor, statement: str, repeats: int) -> tuple[float, list[str]]:
+    timings = []
+    for _ in range(repeats):
+        cursor.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + statement)
+        plan = cursor.fetchone()[0][0]
+        timings.append(plan["Execution Time"])
+    scans = sorted({node for node in node_types(plan["Plan"]) if "Scan" in node})
+    return statistics.median(timings), scans
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dsn", default=os.environ.get("BENCH_DSN", "dbname=postgres host=localhost"))
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(args.dsn)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(SCHEMA_SQL)
+            seed(cursor, args.size, random.Random(42))
+            before = {spec: explain(cursor, BASELINE_HEAD + where + BASELINE_TAIL, args.repeats)
+                      for spec, where in BASELINE_WHERE.items()}
+            cursor.execute(MIGRATION.read_text(encoding="utf-8"))
+            cursor.execute('ANALYZE "Employees"')
+            for spec in BASELINE_WHERE:
+                query, params = DbQueryParser.parse({"intent": {"name": "find_birthday"},
+                                                     "entities": [{"entity": "birthday_specifier", "value": spec}]})
+                after = explain(cursor, cursor.mogrify(query, params).decode("utf-8"), args.repeats)
+                print(f"{spec}: до {before[spec][0]:.2f} мс {before[spec][1]}, после {after[0]:.2f} мс {after[1]}")
+            cursor.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
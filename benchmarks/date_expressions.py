@@ -0,0 +1,206 @@
+"""
+Сравнение разбора выражений дат: прежний каскад проверок подстрок и interesch.date_expressions.
+Сначала на случайных выражениях и случайных "сегодня" проверяется, что результаты совпадают
+с прежней реализацией, затем печатается пропускная способность (холодный разбор и с кэшем за день).
+Запуск: `python -m benchmarks.date_expressions --cases 20000 --rounds 200`.
+"""
+import argparse
+import datetime
+import logging
+import random
+import time
+
+from interesch.date_expressions import (MONTH_NAME_TO_NUMBER, _parse_date_range, _parse_month_day_range,
+                                        parse_date_range, parse_month_day_range)
+
+FRAGMENTS = [
+    "сегодня", "завтра", "послезавтра", "вчера", "позавчера", "зимой", "зима", "весной", "весна", "летом",
+    "лето", "осенью", "осень", "на этой", "на следующей", "на прошлой", "неделе", "в этом", "в следующем",
+    "в прошлом", "месяце", "квартале", "году", "в", "на", "мероприятия", "задачи", "смарт", "годовой",
+    *MONTH_NAME_TO_NUMBER, "1", "5", "20", "29", "31", "0", "12", "2024", ".", "10.05", "31.02", "1.1.2025",
+]
+BENCH_VALUES = [
+    "сегодня", "завтра", "на этой неделе", "на следующей неделе", "в этом месяце", "в прошлом квартале",
+    "в следующем году", "20 мая", "в июне", "зимой", "10.05", "10.05.2024", "что-то непонятное",
+]
+
+
+def _get_quarter_dates(year, quarter):
+    if quarter == 1: return datetime.date(year, 1, 1), datetime.date(year, 3, 31)
+    if quarter == 2: return datetime.date(year, 4, 1), datetime.date(year, 6, 30)
+    if quarter == 3: return datetime.date(year, 7, 1), datetime.date(year, 9, 30)
+    return datetime.date(year, 10, 1), datetime.date(year, 12, 31)
+
+
+def _next_month(date_obj):
+    return (date_obj.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+
+
+def _season_ranges(today, first_month):
+    if first_month == 12:
+        return [(datetime.date(today.year - 1, 12, 1), datetime.date(today.year, 3, 1)),
+                (datetime.date(today.year, 12, 1), datetime.date(today.year + 1, 3, 1))]
+    return [(datetime.date(today.year, first_month, 1), datetime.date(today.year, first_month + 3, 1))]
+
+
+def parse_relative_date_entity_baseline(date_entity_value, today):
+    date_lower = date_entity_value.lower()
+    day = datetime.timedelta(days=1)
+    if date_lower == "сегодня": return [(today, today + day)]
+    if date_lower == "завтра": return [(today + day, today + 2 * day)]
+    if date_lower == "послезавтра": return [(today + 2 * day, today + 3 * day)]
+    if date_lower == "вчера": return [(today - day, today)]
+    if date_lower == "позавчера": return [(today - 2 * day, today - day)]
+    if "зимой" in date_lower or "зима" in date_lower: return _season_ranges(today, 12)
+    if "весной" in date_lower or "весна" in date_lower: return _season_ranges(today, 3)
+    if "летом" in date_lower or "лето" in date_lower: return _season_ranges(today, 6)
+    if "осенью" in date_lower or "осень" in date_lower: return _season_ranges(today, 9)
+    start_of_week = today - datetime.timedelta(days=today.weekday())
+    if "на эт" in date_lower and "недел" in date_lower:
+        return [(start_of_week, start_of_week + 7 * day)]
+    if "на след" in date_lower and "недел" in date_lower:
+        return [(start_of_week + 7 * day, start_of_week + 14 * day)]
+    if "на прошл" in date_lower and "недел" in date_lower:
+        return [(start_of_week - 7 * day, start_of_week)]
+    start_of_month = today.replace(day=1)
+    if "в эт" in date_lower and "месяц" in date_lower:
+        return [(start_of_month, _next_month(start_of_month))]
+    if "в след" in date_lower and "месяц" in date_lower:
+        next_month_first_day = _next_month(start_of_month)
+        return [(next_month_first_day, _next_month(next_month_first_day))]
+    if "в прошл" in date_lower and "месяц" in date_lower:
+        return [((start_of_month - day).replace(day=1), start_of_month)]
+    current_quarter, current_year = (today.month - 1) // 3 + 1, today.year
+    if "в эт" in date_lower and "квартал" in date_lower:
+        start_q, end_q = _get_quarter_dates(current_year, current_quarter)
+        return [(start_q, end_q + day)]
+    if "в след" in date_lower and "квартал" in date_lower:
+        next_q, next_y = (current_quarter + 1, current_year) if current_quarter < 4 else (1, current_year + 1)
+        start_q, end_q = _get_quarter_dates(next_y, next_q)
+        return [(start_q, end_q + day)]
+    if "в прошл" in date_lower and "квартал" in date_lower:
+        prev_q, prev_y = (current_quarter - 1, current_year) if current_quarter > 1 else (4, current_year - 1)
+        start_q, end_q = _get_quarter_dates(prev_y, prev_q)
+        return [(start_q, end_q + day)]
+    if "в эт" in date_lower and "год" in date_lower:
+        return [(datetime.date(today.year, 1, 1), datetime.date(today.year + 1, 1, 1))]
+    if "в след" in date_lower and "год" in date_lower:
+        return [(datetime.date(today.year + 1, 1, 1), datetime.date(today.year + 2, 1, 1))]
+    if "в прошл" in date_lower and "год" in date_lower:
+        return [(datetime.date(today.year - 1, 1, 1), datetime.date(today.year, 1, 1))]
+    for month_name_key, month_number_val in MONTH_NAME_TO_NUMBER.items():
+        if month_name_key in date_lower:
+            day_in_month_str = ''.join(filter(str.isdigit, date_lower.replace(month_name_key, "")))
+            day_in_month = int(day_in_month_str) if day_in_month_str else None
+            if day_in_month:
+                try:
+                    exact_date = datetime.date(today.year, month_number_val, day_in_month)
+                    return [(exact_date, exact_date + day)]
+                except ValueError:
+                    pass
+            start_of_month = datetime.date(today.year, month_number_val, 1)
+            return [(start_of_month, _next_month(start_of_month))]
+    try:
+        if '.' in date_entity_value:
+            parts = date_entity_value.split('.')
+            exact_date = None
+            if len(parts) == 2 and parts[0].isdigit() and parts[1].isdigit():
+                exact_date = datetime.datetime.strptime(f"{parts[0]}.{parts[1]}.{today.year}", "%d.%m.%Y").date()
+            if len(parts) == 3 and parts[0].isdigit() and parts[1].isdigit() and parts[2].isdigit():
+                exact_date = datetime.datetime.strptime(date_entity_value, "%d.%m.%Y").date()
+            if exact_date:
+                return [(exact_date, exact_date + day)]
+    except ValueError:
+        pass
+    return []
+
+
+def get_month_day_from_specifier_baseline(specifier_value, today):
+    specifier_lower = specifier_value.lower()
+
+    def month_day(date_obj):
+        return date_obj.month * 100 + date_obj.day
+
+    if specifier_lower == "сегодня":
+        return [(month_day(today),) * 2]
+    if specifier_lower == "завтра":
+        return [(month_day(today + datetime.timedelta(days=1)),) * 2]
+    if specifier_lower == "вчера":
+        return [(month_day(today - datetime.timedelta(days=1)),) * 2]
+    if specifier_lower == "в этом месяце": return [(today.month * 100 + 1, today.month * 100 + 31)]
+    for month_name, month_number in MONTH_NAME_TO_NUMBER.items():
+        if month_name in specifier_lower:
+            day_str = ''.join(filter(str.isdigit, specifier_lower.replace(month_name, "")))
+            day = int(day_str) if day_str else None
+            if day:
+                return [(month_number * 100 + day,) * 2]
+            return [(month_number * 100 + 1, month_number * 100 + 31)]
+    if "зимой" in specifier_lower or "зима" in specifier_lower: return [(1201, 1231), (101, 229)]
+    if "весной" in specifier_lower or "весна" in specifier_lower: return [(301, 531)]
+    if "летом" in specifier_lower or "лето" in specifier_lower: return [(601, 831)]
+    if "осенью" in specifier_lower or "осень" in specifier_lower: return [(901, 1130)]
+    return []
+
+
+def random_expression(rng: random.Random) -> str:
+    words = rng.choices(FRAGMENTS, k=rng.randint(1, 4))
+    expression = rng.choice([" ", ""]).join(words)
+    return expression.upper() if rng.random() < 0.1 else expression
+
+
+def check_equivalence(cases: int, rng: random.Random):
+    first_day = datetime.date(2020, 1, 1)
+    overflows = 0
+    for _ in range(cases):
+        expression = random_expression(rng)
+        today = first_day + datetime.timedelta(days=rng.randrange(365 * 10))
+        try:
+            expected = parse_relative_date_entity_baseline(expression, today)
+        except OverflowError:
+            # Прежняя реализация падала на слишком длинном числе дня; новая берёт весь месяц.
+            overflows += 1
+            expected = [tuple(date_range) for date_range in parse_date_range(expression, today)]
+        actual = [tuple(date_range) for date_range in parse_date_range(expression, today)]
+        assert actual == expected, (expression, today, expected, actual)
+        expected = get_month_day_from_specifier_baseline(expression, today)
+        actual = [tuple(month_day_range) for month_day_range in parse_month_day_range(expression, today)]
+        assert actual == expected, (expression, today, expected, actual)
+    print(f"Совпадение с прежней реализацией: {cases} случайных выражений "
+          f"(из них {overflows} с переполнением дня в прежней реализации)")
+
+
+def measure(title: str, func, rounds: int, repeats: int = 5):
+    """Лучший из repeats прогонов: на общей машине отдельные прогоны сильно шумят."""
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for value in BENCH_VALUES:
+                func(value)
+        best = min(best, time.perf_counter() - started)
+    print(f"{title}: {rounds * len(BENCH_VALUES) / best:,.0f} выражений/с")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cases", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    check_equivalence(args.cases, random.Random(42))
+
+    today = datetime.date.today()
+    measure("прежний каскад", lambda value: parse_relative_date_entity_baseline(value, today), args.rounds)
+    measure("разбор по токенам без кэша", lambda value: _parse_date_range.__wrapped__(value.lower(), today),
+            args.rounds)
+    measure("разбор по токенам с кэшем за день", parse_date_range, args.rounds)
+    measure("дни рождения: прежний каскад",
+            lambda value: get_month_day_from_specifier_baseline(value, today), args.rounds)
+    measure("дни рождения: разбор по токенам без кэша",
+            lambda value: _parse_month_day_range.__wrapped__(value.lower(), today), args.rounds)
+    print(f"Кэш: {_parse_date_range.cache_info()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Бенчмарк search_event до и после перехода на полуоткрытые диапазоны по "Begin" с индексом (migrations/004):
+прежние условия ev."Begin"::date / EXTRACT(MONTH ...) без индекса против текущих условий DbQueryParser с индексом.
+Печатает время выполнения и типы сканирования из EXPLAIN ANALYZE.
+Запуск: `python -m benchmarks.event_date_range --dsn "dbname=bench host=localhost" --size 1000000`.
+"""
+import argparse
+import datetime
+import os
+import random
+import statistics
+from pathlib import Path
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from benchmarks.name_search import node_types
+from interesch import DbQueryParser
+
+SCHEMA = "bench_event_date_range"
+MIGRATION = Path(__file__).resolve().parent.parent / "migrations" / "004_event_task_begin_index.sql"
+
+BASELINE_HEAD = ('SELECT \'EventList\', ev."Name" AS event_name, ev."Begin" AS event_begin, ev."End" AS event_end, '
+                 'cat."Name" AS category_name, ev."Description" AS event_description, '
+                 'emp."Name" AS organizer_name, emp."Surname" AS organizer_surname FROM "Event" AS ev '
+                 'LEFT JOIN "Categories" AS cat ON cat."Category_Id" = ev."CategoryId" '
+                 'LEFT JOIN "Employees" AS emp ON emp."Employee_Id" = ev."EmployeeId" WHERE ')
+BASELINE_TAIL = ' ORDER BY ev."Begin" ASC LIMIT 10'
+BASELINE_WHERE = {
+    "сегодня": 'ev."Begin"::date = CURRENT_DATE',
+    "на этой неделе": ('ev."Begin"::date >= date_trunc(\'week\', CURRENT_DATE)::date '
+                       'AND ev."Begin"::date <= (date_trunc(\'week\', CURRENT_DATE) + INTERVAL \'6 days\')::date'),
+    "в этом месяце": ('ev."Begin"::date >= date_trunc(\'month\', CURRENT_DATE)::date '
+                      'AND ev."Begin"::date <= (date_trunc(\'month\', CURRENT_DATE) '
+                      '+ INTERVAL \'1 month - 1 day\')::date'),
+    "зимой": 'EXTRACT(MONTH FROM ev."Begin") IN (12, 1, 2)',
+}
+
+SCHEMA_SQL = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+SET search_path TO {SCHEMA}, public;
+CREATE TABLE "Categories" ("Category_Id" serial PRIMARY KEY, "Name" text);
+CREATE TABLE "Employees" ("Employee_Id" serial PRIMARY KEY, "Name" text, "Surname" text);
+CREATE TABLE "Event" (
+    "Event_Id" serial PRIMARY KEY, "Name" text, "Begin" timestamptz, "End" timestamptz,
+    "CategoryId" int, "Description" text, "EmployeeId" int
+);
+CREATE TABLE "Task" ("Task_Id" serial PRIMARY KEY, "Begin" timestamptz);
+"""
+
+
+def seed(cursor, size: int, rng: random.Random):
+    execute_values(cursor, 'INSERT INTO "Categories" ("Name") VALUES %s', [(f"Категория {i}",) for i in range(10)])
+    execute_values(cursor, 'INSERT INTO "Employees" ("Name", "Surname") VALUES %s',
+                   [(f"Имя{i}", f"Фамилия{i}") for i in range(1000)])
+    # История за 10 лет до сегодняшнего дня плюс год вперёд.
+    start = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=3650)
+    span_minutes = 4015 * 24 * 60
+    for offset in range(0, size, 100_000):
+        rows = [(f"Мероприятие {i}", begin, begin + datetime.timedelta(hours=2), rng.randint(1, 10), None,
+                 rng.randint(1, 1000))
+                for i in range(offset, min(offset + 100_000, size))
+                for begin in [start + datetime.timedelta(minutes=rng.randrange(span_minutes))]]
+        execute_values(cursor, 'INSERT INTO "Event" ("Name", "Begin", "End", "CategoryId", "Description", '
+                               '"EmployeeId") VALUES %s', rows, page_size=10_000)
+    cursor.execute('ANALYZE "Event"')
+
+
+def explain(cursor, statement: str, repeats: int) -> tuple[float, list[str]]:
+    timings = []
+    for _ in range(repeats):
+        cursor.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + statement)
+        plan = cursor.fetchone()[0][0]
+        timings.append(plan["Execution Time"])
+    scans = sorted({node for node in node_types(plan["Plan"]) if "Scan" in node})
+    return statistics.median(timings), scans
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dsn", default=os.environ.get("BENCH_DSN", "dbname=postgres host=localhost"))
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(args.dsn)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(SCHEMA_SQL)
+            seed(cursor, args.size, random.Random(42))
+            before = {spec: explain(cursor, BASELINE_HEAD + where + BASELINE_TAIL, args.repeats)
+                      for spec, where in BASELINE_WHERE.items()}
+            cursor.execute(MIGRATION.read_text(encoding="utf-8"))
+            cursor.execute('ANALYZE "Event"')
+            for spec in BASELINE_WHERE:
+                query, params = DbQueryParser.parse({"intent": {"name": "search_event"},
+                                                     "entities": [{"entity": "date", "value": spec}]})
+                after = explain(cursor, cursor.mogrify(query, params).decode("utf-8"), args.repeats)
+                print(f"{spec}: до {before[spec][0]:.2f} мс {before[spec][1]}, после {after[0]:.2f} мс {after[1]}")
+            cursor.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""
+Синтетическая база для бенчмарков всего конвейера: отдельная база данных со схемой бота
+(Employees, Event, Task, Project, Department, Categories и справочники), заполненная
+данными заданного масштаба, и все миграции из migrations/.
+Запуск: `python -m benchmarks.fixtures --dsn "dbname=postgres host=localhost" --employees 2000`.
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+from pathlib import Path
+
+import psycopg2
+from psycopg2.extensions import make_dsn, parse_dsn
+from psycopg2.extras import execute_values
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+
+DEFAULT_DATABASE = "interesch_bench"
+
+NAMES = ["Андрей", "Алексей", "Иван", "Пётр", "Мария", "Анна", "Елена", "Дмитрий", "Сергей", "Ольга",
+         "Наталья", "Михаил", "Татьяна", "Николай", "Екатерина", "Владимир", "Юлия", "Артём", "Ксения", "Павел"]
+SURNAMES = ["Волков", "Иванов", "Петров", "Смирнов", "Кузнецов", "Попов", "Соколов", "Лебедев", "Козлов",
+            "Новиков", "Морозов", "Соловьёв", "Васильев", "Зайцев", "Павлов", "Семёнов", "Голубев", "Виноградов"]
+FATHERS = ["Андреевич", "Иванович", "Петрович", "Сергеевич", "Алексеевич", "Дмитриевич"]
+LANGUAGES = ["Python", "Java", "C#", "Go", "TypeScript", "Kotlin"]
+RANKS = ["Junior", "Middle", "Senior", "Lead"]
+PROJECTS = ["Портал", "Мобильное приложение", "Биллинг", "CRM", "Аналитика", "Интеграции"]
+DEPARTMENTS = ["Разработка", "Тестирование", "Аналитика", "Маркетинг", "Продажи", "HR"]
+CATEGORIES = ["Митап", "Тренинг", "Корпоратив", "Хакатон", "Конференция", "Спорт"]
+TASK_STATUSES = ["Новая", "В работе", "Выполнена"]
+TASK_PRIORITIES = ["Низкий", "Средний", "Высокий"]
+DESCRIPTION_WORDS = ["обсуждение", "релиза", "команды", "проекта", "интеграция", "с", "API", "и", "подготовка",
+                     "отчёта", "по", "итогам", "квартала", "новые", "возможности", "платформы"]
+
+SCHEMA_SQL = """
+DROP TABLE IF EXISTS "Authentication", "Task", "Event", "Categories", "Employees",
+    "Department", "Project", "Rank", "Languages" CASCADE;
+CREATE TABLE "Languages" ("Language_Id" serial PRIMARY KEY, "Name" text);
+CREATE TABLE "Rank" ("Rank_Id" serial PRIMARY KEY, "Status" text);
+CREATE TABLE "Project" ("Project_Id" serial PRIMARY KEY, "Name" text);
+CREATE TABLE "Department" ("Department_Id" serial PRIMARY KEY, "Name" text);
+CREATE TABLE "Categories" ("Category_Id" serial PRIMARY KEY, "Name" text);
+CREATE TABLE "Employees" (
+    "Employee_Id" serial PRIMARY KEY, "Name" text, "Surname" text, "Father" text,
+    "Birthday" date, "FirstDay" date, "LanguageId" int, "RankId" int, "ProjectId" int,
+    "DepartmentId" int, "Contacts" jsonb
+);
+CREATE TABLE "Event" (
+    "Event_Id" serial PRIMARY KEY, "Name" text, "Begin" timestamptz NOT NULL, "End" timestamptz,
+    "CategoryId" int, "Description" text, "EmployeeId" int
+);
+CREATE TABLE "Task" (
+    "Task_Id" serial PRIMARY KEY, "Name" text, "Description" text, "Begin" timestamptz,
+    "EmployeeId" int, "Status" text, "Priority" text, "Tags" text
+);
+CREATE TABLE "Authentication" ("TelegramId" bigint PRIMARY KEY);
+"""
+
+
+def database_dsn(admin_dsn: str, database: str) -> str:
+    """DSN базы database с теми же параметрами подключения, что и admin_dsn."""
+    return make_dsn(admin_dsn, dbname=database)
+
+
+def bot_environment(dsn: str) -> dict:
+    """Переменные окружения DB_*, которыми interesch.__main__ настраивает подключение."""
+    params = parse_dsn(dsn)
+    return {
+        "DB_NAME": params.get("dbname", ""),
+        "DB_USER": params.get("user", os.environ.get("PGUSER", "postgres")),
+        "DB_PASSWORD": params.get("password", os.environ.get("PGPASSWORD", "")),
+        "DB_HOST": params.get("host", "localhost"),
+        "DB_PORT": params.get("port", "5432"),
+    }
+
+
+def create_database(admin_dsn: str, database: str):
+    conn = psycopg2.connect(admin_dsn)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", (database,))
+            if cursor.fetchone() is None:
+                cursor.execute(f'CREATE DATABASE "{database}"')
+    finally:
+        conn.close()
+
+
+def _description(rng: random.Random) -> str | None:
+    if rng.random() < 0.2:
+        return None
+    return " ".join(rng.choices(DESCRIPTION_WORDS, k=rng.randint(3, 40)))
+
+
+def seed(cursor, employees: int, events: int, tasks: int, rng: random.Random):
+    for table, column, values in (("Languages", "Name", LANGUAGES), ("Rank", "Status", RANKS),
+                                  ("Project", "Name", PROJECTS), ("Department", "Name", DEPARTMENTS),
+                                  ("Categories", "Name", CATEGORIES)):
+        execute_values(cursor, f'INSERT INTO "{table}" ("{column}") VALUES %s', [(value,) for value in values])
+
+    rows = []
+    for i in range(employees):
+        surname = rng.choice(SURNAMES)
+        female = rng.random() < 0.5
+        rows.append((
+            rng.choice(NAMES), surname + "а" if female else surname, rng.choice(FATHERS),
+            datetime.date(1965, 1, 1) + datetime.timedelta(days=rng.randrange(365 * 38)),
+            datetime.date(2012, 1, 1) + datetime.timedelta(days=rng.randrange(365 * 13)),
+            rng.randint(1, len(LANGUAGES)), rng.randint(1, len(RANKS)), rng.randint(1, len(PROJECTS)),
+            rng.randint(1, len(DEPARTMENTS)),
+            json.dumps({"phone": f"+7 900 {i:07d}", "email": f"employee{i}@example.com"}),
+        ))
+    execute_values(cursor, 'INSERT INTO "Employees" ("Name", "Surname", "Father", "Birthday", "FirstDay", '
+                           '"LanguageId", "RankId", "ProjectId", "DepartmentId", "Contacts") VALUES %s',
+                   rows, page_size=5000)
+
+    # Мероприятия и задачи — за два года до сегодняшнего дня и на год вперёд.
+    start = datetime.datetime.now(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0) \
+        - datetime.timedelta(days=730)
+    span_hours = 365 * 3 * 24
+    for offset in range(0, events, 50_000):
+        batch = []
+        for i in range(offset, min(offset + 50_000, events)):
+            begin = start + datetime.timedelta(hours=rng.randrange(span_hours))
+            batch.append((f"{rng.choice(CATEGORIES)} №{i}", begin, begin + datetime.timedelta(minutes=rng.choice(
+                [30, 60, 90, 120, 480])), rng.randint(1, len(CATEGORIES)), _description(rng),
+                          rng.randint(1, employees)))
+        execute_values(cursor, 'INSERT INTO "Event" ("Name", "Begin", "End", "CategoryId", "Description", '
+                               '"EmployeeId") VALUES %s', batch, page_size=5000)
+    for offset in range(0, tasks, 50_000):
+        batch = []
+        for i in range(offset, min(offset + 50_000, tasks)):
+            deadline = None if rng.random() < 0.1 else start + datetime.timedelta(hours=rng.randrange(span_hours))
+            batch.append((f"Задача №{i}", _description(rng), deadline, rng.randint(1, employees),
+                          rng.choice(TASK_STATUSES), rng.choice(TASK_PRIORITIES), None))
+        execute_values(cursor, 'INSERT INTO "Task" ("Name", "Description", "Begin", "EmployeeId", "Status", '
+                               '"Priority", "Tags") VALUES %s', batch, page_size=5000)
+
+
+def apply_migrations(cursor):
+    for migration in sorted(MIGRATIONS_DIR.glob("*.sql")):
+        cursor.execute(migration.read_text(encoding="utf-8"))
+
+
+def prepare(admin_dsn: str, database: str = DEFAULT_DATABASE, employees: int = 2000, events: int = 100_000,
+            tasks: int = 50_000, random_seed: int = 42) -> str:
+    """Создаёт (или пересоздаёт) базу database с синтетическими данными и возвращает её DSN."""
+    create_database(admin_dsn, database)
+    dsn = database_dsn(admin_dsn, database)
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(SCHEMA_SQL)
+            seed(cursor, employees, events, tasks, random.Random(random_seed))
+            apply_migrations(cursor)
+        conn.commit()
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute("ANALYZE")
+    finally:
+        conn.close()
+    return dsn
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--dsn", default=os.environ.get("BENCH_DSN", "dbname=postgres host=localhost"),
+                        help="подключение с правом CREATE DATABASE")
+    parser.add_argument("--database", default=DEFAULT_DATABASE)
+    parser.add_argument("--employees", type=int, default=2000)
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--tasks", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=42)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_arguments(parser)
+    args = parser.parse_args()
+    print(f"База готова: {prepare(args.dsn, args.database, args.employees, args.events, args.tasks, args.seed)}")
@@ -0,0 +1,52 @@
+"""
+Микробенчмарк лемматизации значений сущностей: задержка на одну сущность
+для прежней реализации (maketrans и morph.parse на каждый вызов) и для кэширующей.
+Запуск: `python -m benchmarks.lemmatizer --rounds 2000`.
+"""
+import argparse
+import string
+import time
+
+from interesch import lemma_cache_info, lemmatize_entity_value, lemmatize_many
+from interesch.text_normalizer import get_morph
+
+ENTITY_VALUES = [
+    "в июне", "в декабре", "отдела разработки", "отдел маркетинга", "на Python", "Java",
+    "Волкова Андрея", "Иванова Петра", "Смирновой", "корпоративные тренинги", "хакатоны",
+    "высокий приоритет", "невыполненные", "в работе", "backend", "Алексея",
+]
+
+
+def lemmatize_entity_value_baseline(text_value: str) -> str:
+    if not text_value:
+        return ""
+    translator = str.maketrans('', '', string.punctuation)
+    words = text_value.lower().translate(translator).split()
+    morph = get_morph()
+    return " ".join(morph.parse(word)[0].normal_form for word in words if word.strip())
+
+
+def measure(title: str, func, rounds: int):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    elapsed = time.perf_counter() - started
+    per_entity = elapsed / (rounds * len(ENTITY_VALUES)) * 1e6
+    print(f"{title}: {per_entity:.2f} мкс на сущность")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    assert [lemmatize_entity_value_baseline(v) for v in ENTITY_VALUES] == lemmatize_many(ENTITY_VALUES)
+
+    measure("до (baseline)", lambda: [lemmatize_entity_value_baseline(v) for v in ENTITY_VALUES], args.rounds)
+    measure("lemmatize_entity_value", lambda: [lemmatize_entity_value(v) for v in ENTITY_VALUES], args.rounds)
+    measure("lemmatize_many", lambda: lemmatize_many(ENTITY_VALUES), args.rounds)
+    print(f"Кэш лемм: {lemma_cache_info()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Нагрузочный тест обработки обновлений: N чатов одновременно присылают по несколько сообщений,
+обработчик ходит в заглушку NLU и в имитацию БД (пул из pool-size соединений, запрос — db-delay с).
+Сравнивает последовательную обработку (как app.run_polling() по умолчанию) с ChatOrderedUpdateProcessor,
+печатает пропускную способность и p50/p99 задержки ответа и проверяет порядок сообщений внутри чатов.
+Запуск: `python -m benchmarks.load_test --chats 300 --messages 3 --workers 32`.
+"""
+import argparse
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+
+from benchmarks.nlu_client import percentile
+from benchmarks.stub_nlu import start_stub_server, stub_url
+from interesch import AsyncAiRequestProcessor
+from interesch.update_processor import ChatOrderedUpdateProcessor
+
+MESSAGES = [
+    "Найди Волкова Андрея",
+    "Какие мероприятия на неделе?",
+    "У кого день рождения сегодня?",
+    "Задачи Алексея",
+]
+
+
+class Simulation:
+    def __init__(self, nlu_url: str, max_in_flight: int, pool_size: int, db_delay: float):
+        self.processor = AsyncAiRequestProcessor(base_url=nlu_url, max_in_flight=max_in_flight)
+        self.pool = asyncio.Semaphore(pool_size)
+        self.db_delay = db_delay
+        self.latencies = []
+        self.order = defaultdict(list)
+
+    async def handle(self, update, arrived: float):
+        await self.processor.process_query(update.message.text)
+        async with self.pool:
+            await asyncio.sleep(self.db_delay)
+        self.order[update.effective_chat.id].append(update.sequence)
+        self.latencies.append(time.perf_counter() - arrived)
+
+    def check_order(self) -> bool:
+        return all(sequence == sorted(sequence) for sequence in self.order.values())
+
+
+def make_updates(chats: int, messages: int) -> list:
+    # Сообщения приходят вперемешку: сначала первые сообщения всех чатов, затем вторые и т. д.
+    return [
+        SimpleNamespace(effective_chat=SimpleNamespace(id=chat_id), sequence=sequence,
+                        message=SimpleNamespace(text=MESSAGES[(chat_id + sequence) % len(MESSAGES)]))
+        for sequence in range(messages) for chat_id in range(chats)
+    ]
+
+
+async def run_sequential(simulation: Simulation, updates: list) -> float:
+    started = time.perf_counter()
+    for update in updates:
+        await simulation.handle(update, started)
+    return time.perf_counter() - started
+
+
+async def run_concurrent(simulation: Simulation, updates: list, workers: int, max_pending: int | None) -> float:
+    processor = ChatOrderedUpdateProcessor(workers, max_pending)
+    started = time.perf_counter()
+    # Как Application: на каждое обновление — отдельная задача в порядке поступления.
+    tasks = [asyncio.create_task(processor.process_update(update, simulation.handle(update, started)))
+             for update in updates]
+    await asyncio.gather(*tasks)
+    return time.perf_counter() - started
+
+
+def report(title: str, simulation: Simulation, elapsed: float):
+    latencies = simulation.latencies
+    print(f"{title}: {len(latencies) / elapsed:.1f} сообщений/с, "
+          f"p50={percentile(latencies, 50) * 1000:.0f} мс, p99={percentile(latencies, 99) * 1000:.0f} мс, "
+          f"порядок в чатах {'сохранён' if simulation.check_order() else 'НАРУШЕН'}")
+
+
+async def run(args, url: str):
+    updates = make_updates(args.chats, args.messages)
+    if not args.skip_sequential:
+        simulation = Simulation(url, args.max_in_flight, args.pool_size, args.db_delay)
+        report("последовательно", simulation, await run_sequential(simulation, updates))
+        await simulation.processor.close()
+    simulation = Simulation(url, args.max_in_flight, args.pool_size, args.db_delay)
+    elapsed = await run_concurrent(simulation, updates, args.workers, args.max_pending)
+    report(f"ChatOrderedUpdateProcessor (workers={args.workers})", simulation, elapsed)
+    await simulation.processor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chats", type=int, default=300)
+    parser.add_argument("--messages", type=int, default=3, help="сообщений от каждого чата")
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--max-pending", type=int, default=None)
+    parser.add_argument("--max-in-flight", type=int, default=20, help="одновременных запросов к NLU")
+    parser.add_argument("--pool-size", type=int, default=10, help="соединений в имитации пула БД")
+    parser.add_argument("--nlu-delay", type=float, default=0.02, help="задержка ответа заглушки NLU, с")
+    parser.add_argument("--db-delay", type=float, default=0.01, help="длительность запроса к БД, с")
+    parser.add_argument("--skip-sequential", action="store_true")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    server = start_stub_server(delay=args.nlu_delay)
+    try:
+        asyncio.run(run(args, stub_url(server)))
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+"""
+Бенчмарк отрисовки ответов: прежний DbResponseParser (dedent/shorten/strftime и += на каждой строке)
+против interesch.message_renderer. Для каждого типа результата генерирует синтетические строки,
+проверяет, что HTML совпадает байт в байт, и печатает время отрисовки.
+Запуск: `python -m benchmarks.message_renderer --rows 10000`.
+"""
+import argparse
+import datetime
+import random
+import textwrap
+import time
+
+from interesch import DbResponseParser
+from interesch.rows import BirthdayRecord, EventRecord, PersonRecord, TaskRecord
+
+WORDS = ["встреча", "команды", "по", "проекту", "обсуждение", "релиза", "  ", "\t", "интеграция", "API",
+         "back-end", "очень-очень-длинное-слово-без-пробелов", "и", "ещё", "немного", "текста"]
+
+
+class BaselineResponseParser:
+    """Прежняя реализация DbResponseParser — эталон для сравнения."""
+
+    @staticmethod
+    def parse_into_message(data_list: list) -> str:
+        if not data_list or not data_list[0]:
+            return "По вашему запросу ничего не найдено."
+        first_record = data_list[0]
+        result_type = first_record[0]
+
+        match result_type:
+            case "PersonInfo":
+                return BaselineResponseParser.parse_person(first_record)
+            case "BirthdayList":
+                return BaselineResponseParser.parse_birthday_results(data_list)
+            case "TaskList":
+                return BaselineResponseParser.parse_task_results(data_list)
+            case "EventList":
+                return BaselineResponseParser.parse_event_results(data_list)
+            case _:
+                return f"Неизвестный тип результата для отображения: {result_type}"
+
+    @staticmethod
+    def parse_person(data_row: tuple) -> str:
+        contacts = data_row[10] if len(data_row) > 10 and data_row[10] else {}
+        phone = contacts.get("phone")
+        email = contacts.get("email")
+        birthday_str = data_row[4].strftime("%d.%m.%Y") if data_row[4] else "-"
+        firstday_str = data_row[5].strftime("%d.%m.%Y") if data_row[5] else "-"
+        return textwrap.dedent(f'''
+                Нашёл первое совпадение:
+
+                <b>{data_row[1] or ""} {data_row[2] or ""} {data_row[3] or ""}</b>
+                <b>День рождения:</b> {birthday_str}
+                <b>Вступил в должность:</b> {firstday_str}
+                <b>Пишет на:</b> {data_row[6] or "-"}
+                <b>Грейд:</b> {data_row[7] or "-"}
+                <b>Сейчас работает над проектом:</b> {data_row[8] or "-"}
+                <b>Состоит в отделе:</b> {data_row[9] or "-"}
+                {f"<b>Почта:</b> {email}" if email else "<b>Почта:</b> -"}
+                {f"<b>Номер телефона:</b> {phone}" if phone else "<b>Номер телефона:</b> -"}
+            ''').strip()
+
+    @staticmethod
+    def parse_birthday_results(data_list: list) -> str:
+        if not data_list:
+            return "Дни рождения по вашим критериям не найдены."
+        messages = ["<b>Найдены следующие дни рождения:</b>"]
+        for row in data_list:
+            surname = row[1] or ""
+            name = row[2] or ""
+            father = row[3] or ""
+            birthday_date = row[4]
+            department_name = row[5] or "Не указан"
+            birthday_str = birthday_date.strftime("%d.%m") if isinstance(birthday_date, (
+            datetime.date, datetime.datetime)) else "Дата не указана"
+            person_info = f"{surname} {name} {father}".strip()
+            messages.append(f"- {person_info} ({birthday_str}), Отдел: {department_name}")
+        if len(messages) == 1:
+            return "Дни рождения по вашим критериям не найдены."
+        return "\n".join(messages)
+
+    @staticmethod
+    def parse_task_results(data_list: list) -> str:
+        if not data_list:
+            return "Задачи по вашим критериям не найдены."
+        messages = ["<b>Найдены следующие задачи:</b>"]
+        for row in data_list:
+            task_name_val = row[1] or "Без названия"
+            description_val = row[2] or "Нет описания"
+            deadline_val = row[3].strftime("%d.%m.%Y %H:%M") if isinstance(row[3], (
+            datetime.date, datetime.datetime)) else "Нет даты"
+            status_val = "-"
+            priority_val = "-"
+            assignee_name_val = row[4] or ""
+            assignee_surname_val = row[5] or ""
+            project_name_val = row[6] or "Без проекта"
+            assignee_full_name = f"{assignee_surname_val} {assignee_name_val}".strip()
+            task_info = f"<b>{task_name_val}</b> (Проект: {project_name_val})"
+            task_info += f"\n  <i>Описание:</i> {description_val}"
+            task_info += f"\n  Исполнитель: {assignee_full_name if assignee_full_name else '-'}"
+            task_info += f"\n  Дата/Дедлайн: {deadline_val}, Статус: {status_val}, Приоритет: {priority_val}"
+            messages.append(task_info)
+        if len(messages) == 1:
+            return "Задачи по вашим критериям не найдены."
+        return "\n\n".join(messages)
+
+    @staticmethod
+    def parse_event_results(data_list: list) -> str:
+        if not data_list:
+            return "Мероприятия по вашим критериям не найдены."
+
+        messages = ["<b>Найдены следующие мероприятия:</b>"]
+        for row in data_list:
+
+            event_name = row[1] or "Без названия"
+            event_begin_dt = row[2]
+            event_end_dt = row[3]
+            category_name = row[4] or "Не указана"
+            description = row[5] or "Нет описания"
+            organizer_name = row[6] or ""
+            organizer_surname = row[7] or ""
+
+            organizer_full_name = f"{organizer_surname} {organizer_name}".strip()
+            if not organizer_full_name:
+                organizer_full_name = "Не указан"
+
+            begin_str = event_begin_dt.strftime("%d.%m.%Y в %H:%M") if event_begin_dt else "Время начала не указано"
+            end_str = event_end_dt.strftime(
+                "%d.%m.%Y в %H:%M") if event_end_dt else ""
+
+            duration_str = ""
+            if event_begin_dt and event_end_dt and event_end_dt > event_begin_dt:
+                event_duration_td = event_end_dt - event_begin_dt
+                hours, remainder = divmod(event_duration_td.total_seconds(), 3600)
+                minutes, _ = divmod(remainder, 60)
+                if hours > 0 and minutes > 0:
+                    duration_str = f"{int(hours)} ч {int(minutes)} мин"
+                elif hours > 0:
+                    duration_str = f"{int(hours)} ч"
+                elif minutes > 0:
+                    duration_str = f"{int(minutes)} мин"
+                elif event_duration_td.total_seconds() > 0:
+                    duration_str = f"{int(event_duration_td.total_seconds())} сек"
+
+            event_info = f"<b>{event_name}</b> (Категория: {category_name})"
+            event_info += f"\n  <i>Начало:</i> {begin_str}"
+            if end_str and not duration_str:
+                event_info += f"\n  <i>Окончание:</i> {end_str}"
+            elif duration_str:
+                event_info += f", <i>Длительность:</i> {duration_str}"
+
+            event_info += f"\n  <i>Организатор:</i> {organizer_full_name}"
+            if description and description != "Нет описания":
+                event_info += f"\n  <i>Описание:</i> {textwrap.shorten(description, width=100, placeholder='...')}"
+
+            messages.append(event_info)
+
+        if len(messages) == 1:
+            return "Мероприятия по вашим критериям не найдены."
+        return "\n\n".join(messages)
+
+
+def random_text(rng: random.Random, max_words: int) -> str:
+    return " ".join(rng.choices(WORDS, k=rng.randint(0, max_words)))
+
+
+def random_datetime(rng: random.Random):
+    value = datetime.datetime(2020, 1, 1) + datetime.timedelta(minutes=rng.randrange(60 * 24 * 365 * 5))
+    kind = rng.random()
+    if kind < 0.1:
+        return None
+    if kind < 0.2:
+        return value.date()
+    if kind < 0.4:
+        return value.replace(tzinfo=datetime.timezone(datetime.timedelta(hours=3)))
+    return value
+
+
+def maybe(rng: random.Random, value, probability: float = 0.15):
+    return None if rng.random() < probability else value
+
+
+def person_rows(rng: random.Random, count: int) -> list:
+    rows = []
+    for i in range(count):
+        contacts = maybe(rng, {"phone": maybe(rng, f"+7 900 {i:07d}"), "email": maybe(rng, f"user{i}@example.com")})
+        birthday = maybe(rng, datetime.date(1970, 1, 1) + datetime.timedelta(days=rng.randrange(365 * 35)))
+        first_day = maybe(rng, datetime.date(2010, 1, 1) + datetime.timedelta(days=rng.randrange(365 * 15)))
+        rows.append(("PersonInfo", maybe(rng, f"Фамилия{i}"), maybe(rng, f"Имя{i}"), maybe(rng, "Отчество"),
+                     birthday, first_day, maybe(rng, "Python"), maybe(rng, "Middle"), maybe(rng, "Портал"),
+                     maybe(rng, "Разработка"), contacts))
+    return rows
+
+
+def birthday_rows(rng: random.Random, count: int) -> list:
+    return [("BirthdayList", maybe(rng, f"Фамилия{i}"), maybe(rng, f"Имя{i}"), maybe(rng, "Отчество"),
+             maybe(rng, datetime.date(1970, 1, 1) + datetime.timedelta(days=rng.randrange(365 * 35))),
+             maybe(rng, "Разработка")) for i in range(count)]
+
+
+def task_rows(rng: random.Random, count: int) -> list:
+    return [("TaskList", maybe(rng, f"Задача {i}"), maybe(rng, random_text(rng, 30)), random_datetime(rng),
+             maybe(rng, f"Имя{i}"), maybe(rng, f"Фамилия{i}"), maybe(rng, "Портал"), i) for i in range(count)]
+
+
+def event_rows(rng: random.Random, count: int) -> list:
+    rows = []
+    for i in range(count):
+        begin = random_datetime(rng)
+        end = None
+        if begin is not None and rng.random() < 0.8:
+            seconds = rng.choice([-3600, 0, 30, 45 * 60, 3600, 5400, 7200, 86400 + 60])
+            end = begin + (datetime.timedelta(days=seconds // 86400) if type(begin) is datetime.date
+                           else datetime.timedelta(seconds=seconds))
+        description = rng.choice([None, "Нет описания", random_text(rng, 8), random_text(rng, 40)])
+        rows.append(("EventList", maybe(rng, f"Мероприятие {i}"), begin, end, maybe(rng, "Митап"), description,
+                     maybe(rng, f"Имя{i}"), maybe(rng, f"Фамилия{i}"), i))
+    return rows
+
+
+def measure(render, rows, single_row: bool) -> float:
+    started = time.perf_counter()
+    if single_row:
+        for row in rows:
+            render(row)
+    else:
+        for offset in range(0, len(rows), 10):
+            render(rows[offset:offset + 10])
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10000)
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    # Прежний парсер получает кортежи с маркером типа в первом столбце, текущий — записи из rows.py.
+    cases = [
+        ("PersonInfo", person_rows(rng, args.rows), PersonRecord, BaselineResponseParser.parse_person,
+         DbResponseParser.parse_person, True),
+        ("BirthdayList", birthday_rows(rng, args.rows), BirthdayRecord, BaselineResponseParser.parse_birthday_results,
+         DbResponseParser.parse_birthday_results, False),
+        ("TaskList", task_rows(rng, args.rows), TaskRecord, BaselineResponseParser.parse_task_results,
+         DbResponseParser.parse_task_results, False),
+        ("EventList", event_rows(rng, args.rows), EventRecord, BaselineResponseParser.parse_event_results,
+         DbResponseParser.parse_event_results, False),
+    ]
+    for result_type, rows, record_type, baseline, current, single_row in cases:
+        records = [record_type(*row[1:]) for row in rows]
+        for offset in range(0, len(rows), 1 if single_row else 10):
+            if single_row:
+                expected, actual = baseline(rows[offset]), current(records[offset])
+            else:
+                expected, actual = baseline(rows[offset:offset + 10]), current(records[offset:offset + 10])
+            assert actual == expected, (result_type, rows[offset], expected, actual)
+        before = measure(baseline, rows, single_row)
+        after = measure(current, records, single_row)
+        print(f"{result_type}: {len(rows)} строк, до {before * 1000:.1f} мс, после {after * 1000:.1f} мс "
+              f"(x{before / after:.1f}), HTML совпадает")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Бенчмарк поиска сотрудника по имени на синтетической таблице (по умолчанию 100 тыс. сотрудников):
+ILIKE '%...%' без индексов, он же с триграммными индексами из migrations/001 и режим NAME_SEARCH_MODE=trigram.
+Данные создаются в отдельной схеме, которая удаляется после замера.
+Запуск: `python -m benchmarks.name_search --dsn "dbname=bench user=postgres host=localhost"`.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+from pathlib import Path
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from interesch import DbQueryParser
+
+SCHEMA = "bench_name_search"
+MIGRATION = Path(__file__).resolve().parent.parent / "migrations" / "001_employee_name_trgm.sql"
+
+NAMES = ["Андрей", "Алексей", "Иван", "Пётр", "Мария", "Анна", "Елена", "Дмитрий", "Сергей", "Ольга",
+         "Наталья", "Михаил", "Татьяна", "Николай", "Екатерина", "Владимир", "Юлия", "Артём", "Ксения", "Павел"]
+SURNAME_STEMS = ["Волков", "Иванов", "Петров", "Смирнов", "Кузнецов", "Попов", "Соколов", "Лебедев", "Козлов",
+                 "Новиков", "Морозов", "Соловьёв", "Васильев", "Зайцев", "Павлов", "Семёнов", "Голубев", "Виноградов"]
+SUFFIXES = ["", "ский", "ин", "цев", "ников", "ченко", "ович", "енко"]
+
+SCHEMA_SQL = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+SET search_path TO {SCHEMA}, public;
+CREATE TABLE "Languages" ("Language_Id" serial PRIMARY KEY, "Name" text);
+CREATE TABLE "Rank" ("Rank_Id" serial PRIMARY KEY, "Status" text);
+CREATE TABLE "Project" ("Project_Id" serial PRIMARY KEY, "Name" text);
+CREATE TABLE "Department" ("Department_Id" serial PRIMARY KEY, "Name" text);
+CREATE TABLE "Employees" (
+    "Employee_Id" serial PRIMARY KEY, "Name" text, "Surname" text, "Father" text,
+    "Birthday" date, "FirstDay" date, "LanguageId" int, "RankId" int, "ProjectId" int,
+    "DepartmentId" int, "Contacts" jsonb
+);
+"""
+
+
+def seed(cursor, size: int, rng: random.Random):
+    rows = []
+    for i in range(size):
+        surname = rng.choice(SURNAME_STEMS)[:-2] + rng.choice(["ов", "ев", "ин"]) + rng.choice(SUFFIXES) + str(i % 97)
+        if rng.random() < 0.5:
+            surname += "а"
+        rows.append((rng.choice(NAMES), surname))
+    execute_values(cursor, 'INSERT INTO "Employees" ("Name", "Surname") VALUES %s', rows, page_size=5000)
+    for stem in SURNAME_STEMS:
+        cursor.execute('INSERT INTO "Employees" ("Name", "Surname") VALUES (%s, %s), (%s, %s)',
+                       (rng.choice(NAMES), stem, rng.choice(NAMES), stem + "а"))
+    cursor.execute('ANALYZE "Employees"')
+
+
+def measure(cursor, mode: str, lookups: list[str], repeats: int) -> dict:
+    DbQueryParser.name_search_mode = mode
+    timings = []
+    plan_nodes = set()
+    for name in lookups:
+        query, params = DbQueryParser.parse({"intent": {"name": "search_person"},
+                                             "entities": [{"entity": "name", "value": name}]})
+        statement = cursor.mogrify(query, params).decode("utf-8")
+        for _ in range(repeats):
+            cursor.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + statement)
+            explain = cursor.fetchone()[0][0]
+            timings.append(explain["Execution Time"])
+        plan_nodes.update(node_types(explain["Plan"]))
+    return {"median_ms": statistics.median(timings), "p95_ms": sorted(timings)[int(len(timings) * 0.95) - 1],
+            "scans": sorted(node for node in plan_nodes if "Scan" in node)}
+
+
+def node_types(plan: dict):
+    yield plan["Node Type"]
+    for child in plan.get("Plans", []):
+        yield from node_types(child)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dsn", default=os.environ.get("BENCH_DSN", "dbname=postgres host=localhost"))
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    lookups = ["волков", "иванов андрей", "смирнова", "петров", "мария козлова", "лебедев"]
+    conn = psycopg2.connect(args.dsn)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(SCHEMA_SQL)
+            seed(cursor, args.size, rng)
+            results = {"ilike, без индексов": measure(cursor, "ilike", lookups, args.repeats)}
+            cursor.execute(MIGRATION.read_text(encoding="utf-8"))
+            cursor.execute('ANALYZE "Employees"')
+            results["ilike, триграммные индексы"] = measure(cursor, "ilike", lookups, args.repeats)
+            results["trigram, триграммные индексы"] = measure(cursor, "trigram", lookups, args.repeats)
+            for title, result in results.items():
+                print(f"{title}: {json.dumps(result, ensure_ascii=False)}")
+            cursor.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+    finally:
+        DbQueryParser.name_search_mode = "ilike"
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
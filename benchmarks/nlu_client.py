@@ -0,0 +1,85 @@
+"""
+Бенчмарк клиента Rasa NLU: p50/p99 задержки при N одновременных сообщениях.
+
+Все сообщения считаются пришедшими одновременно, задержка — время от прихода до ответа NLU.
+Сравнивает блокирующий `AiRequestProcessor` (как он вызывался из async-обработчика)
+с `AsyncAiRequestProcessor` на локальной заглушке NLU.
+Запуск: `python -m benchmarks.nlu_client --concurrency 100 --delay 0.02`.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.stub_nlu import start_stub_server, stub_url
+from interesch import AiRequestProcessor, AsyncAiRequestProcessor
+
+MESSAGES = [
+    "Найди Волкова Андрея",
+    "Какие мероприятия на неделе?",
+    "У кого день рождения сегодня?",
+    "Задачи Алексея",
+]
+
+
+def message(index: int) -> str:
+    # Тексты уникальны: одинаковые одновременные запросы AsyncAiRequestProcessor объединяет в один.
+    return f"{MESSAGES[index % len(MESSAGES)]} #{index}"
+
+
+def percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def report(title: str, latencies: list[float], elapsed: float):
+    print(f"{title}: p50={percentile(latencies, 50) * 1000:.1f} мс, "
+          f"p99={percentile(latencies, 99) * 1000:.1f} мс, "
+          f"среднее={statistics.mean(latencies) * 1000:.1f} мс, всего={elapsed:.2f} с")
+
+
+async def run_blocking(url: str, concurrency: int):
+    processor = AiRequestProcessor(base_url=url)
+
+    async def one(text: str) -> float:
+        processor.process_query(text)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(one(message(i)) for i in range(concurrency)))
+    report("requests.post в обработчике", latencies, time.perf_counter() - started)
+
+
+async def run_async(url: str, concurrency: int, max_in_flight: int):
+    processor = AsyncAiRequestProcessor(base_url=url, max_in_flight=max_in_flight)
+
+    async def one(text: str) -> float:
+        await processor.process_query(text)
+        return time.perf_counter() - started
+
+    await processor.process_query(MESSAGES[0])
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(one(message(i)) for i in range(concurrency)))
+    report(f"AsyncAiRequestProcessor (max_in_flight={max_in_flight})", latencies, time.perf_counter() - started)
+    await processor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--max-in-flight", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=0.02, help="задержка ответа заглушки, с")
+    args = parser.parse_args()
+
+    server = start_stub_server(delay=args.delay)
+    url = stub_url(server)
+    try:
+        asyncio.run(run_blocking(url, args.concurrency))
+        asyncio.run(run_async(url, args.concurrency, args.max_in_flight))
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
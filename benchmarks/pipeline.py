@@ -0,0 +1,204 @@
+"""
+Бенчмарк всего конвейера бота: handle_text с поддельным Update от сообщения до ответа,
+на синтетической базе из benchmarks.fixtures и заглушке NLU из benchmarks.stub_nlu.
+Печатает пропускную способность и задержки этапов (NLU, лемматизация, построение SQL,
+запрос к БД, отрисовка ответа) по гистограммам interesch.metrics, которые заполняет сам бот,
+и сохраняет их в JSON; с --baseline сравнивает с прежним
+результатом и завершается с кодом 1, если какой-то показатель ухудшился сильнее порога.
+Запуск: `python -m benchmarks.pipeline --dsn "dbname=postgres host=localhost" --requests 2000
+--concurrency 32 --output pipeline.json --baseline previous.json`.
+"""
+import argparse
+import asyncio
+import datetime
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+from benchmarks import fixtures
+from benchmarks.stub_nlu import DATE_WORDS, start_stub_server, stub_url
+from interesch.metrics import TOTAL_STAGE, metrics
+
+STAGES = (TOTAL_STAGE, "nlu", "lemmatize", "sql_build", "db", "render")
+# Корзины гистограмм с шагом 10% от 10 мкс до ~10 с: точнее стандартных для оценки квантилей.
+BENCH_BUCKETS = tuple(1e-5 * 1.1 ** i for i in range(146))
+
+MESSAGE_TEMPLATES = [
+    (4, "Найди {surname} {name}"),
+    (3, "Какие мероприятия {date}?"),
+    (2, "У кого день рождения {date}?"),
+    (2, "Задачи {surname} {name}"),
+    (1, "Привет"),
+]
+
+
+class FakeMessage:
+    # У каждого сообщения свой отправитель, чтобы ограничение частоты запросов не срабатывало.
+    user_ids = itertools.count(1)
+
+    def __init__(self, text: str):
+        self.text = text
+        self.from_user = SimpleNamespace(id=next(self.user_ids))
+        self.replies = []
+
+    async def reply_text(self, text, reply_markup=None, parse_mode=None):
+        self.replies.append(text)
+
+
+def random_message(rng: random.Random) -> str:
+    template = rng.choices([text for _, text in MESSAGE_TEMPLATES],
+                           weights=[weight for weight, _ in MESSAGE_TEMPLATES])[0]
+    return template.format(surname=rng.choice(fixtures.SURNAMES), name=rng.choice(fixtures.NAMES),
+                           date=rng.choice(DATE_WORDS))
+
+
+def summary(stage_name: str, intent: str | None = None) -> dict | None:
+    """Сводка этапа по гистограмме interesch.metrics; None, если этап не выполнялся."""
+    count, seconds = metrics.totals(stage_name, intent)
+    if not count:
+        return None
+    return {
+        "count": count,
+        "mean_ms": seconds / count * 1000,
+        **{f"p{q}_ms": metrics.quantile(q / 100, stage_name, intent) * 1000 for q in (50, 95, 99)},
+    }
+
+
+async def drive(bot, messages: list[str], concurrency: int) -> tuple[int, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = 0
+
+    async def one(text: str):
+        nonlocal errors
+        message = FakeMessage(text)
+        async with semaphore:
+            await bot.handle_text(SimpleNamespace(message=message, effective_chat=None), None)
+        if any("ошибка" in reply for reply in message.replies):
+            errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(text) for text in messages))
+    return errors, time.perf_counter() - started
+
+
+async def run(bot, args) -> dict:
+    app = SimpleNamespace()
+    await bot.post_init(app)
+    try:
+        if args.no_nlu_cache:
+            bot.ai_request_processor.cache = None
+        rng = random.Random(args.seed)
+        await drive(bot, [random_message(rng) for _ in range(args.warmup)], args.concurrency)
+        metrics.clear(BENCH_BUCKETS)
+        errors, elapsed = await drive(bot, [random_message(rng) for _ in range(args.requests)], args.concurrency)
+        cache = bot.ai_request_processor.cache
+        latency = {name: summary(name) for name in STAGES}
+        return {
+            "throughput_rps": args.requests / elapsed,
+            "errors": errors,
+            "latency": {name: values for name, values in latency.items() if values is not None},
+            "latency_by_intent": {
+                intent: {name: values for name in STAGES if (values := summary(name, intent)) is not None}
+                for intent in metrics.intents(TOTAL_STAGE)
+            },
+            "nlu_cache": cache.stats.as_dict() if cache is not None else None,
+            "fast_path": bot.fast_path.stats() if bot.fast_path is not None else None,
+        }
+    finally:
+        await bot.post_shutdown(app)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def regressions(result: dict, baseline: dict, threshold: float) -> list[str]:
+    """Показатели, ухудшившиеся относительно baseline больше чем на threshold (доля)."""
+    found = []
+    if result["throughput_rps"] < baseline["throughput_rps"] * (1 - threshold):
+        found.append(f"throughput: {baseline['throughput_rps']:.1f} -> {result['throughput_rps']:.1f} запросов/с")
+    for name, current in result["latency"].items():
+        previous = baseline["latency"].get(name)
+        if previous is None:
+            continue
+        for key in ("p50_ms", "p95_ms"):
+            if current[key] > previous[key] * (1 + threshold):
+                found.append(f"{name} {key}: {previous[key]:.2f} -> {current[key]:.2f}")
+    return found
+
+
+def report(result: dict):
+    print(f"Пропускная способность: {result['throughput_rps']:.1f} запросов/с, ошибок: {result['errors']}")
+    for name, values in result["latency"].items():
+        print(f"{name:>10}: p50={values['p50_ms']:.2f} мс, p95={values['p95_ms']:.2f} мс, "
+              f"p99={values['p99_ms']:.2f} мс, вызовов={values['count']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    fixtures.add_arguments(parser)
+    parser.add_argument("--skip-seed", action="store_true", help="использовать уже заполненную базу --database")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--nlu-delay", type=float, default=0.0, help="задержка ответа заглушки NLU, с")
+    parser.add_argument("--no-nlu-cache", action="store_true", help="отключить кэш ответов NLU")
+    parser.add_argument("--output", help="файл для результатов в JSON")
+    parser.add_argument("--baseline", help="JSON прежнего прогона для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимое ухудшение, доля")
+    args = parser.parse_args()
+
+    if args.skip_seed:
+        dsn = fixtures.database_dsn(args.dsn, args.database)
+    else:
+        dsn = fixtures.prepare(args.dsn, args.database, args.employees, args.events, args.tasks, args.seed)
+    server = start_stub_server(delay=args.nlu_delay)
+    os.environ.update(fixtures.bot_environment(dsn))
+    os.environ["NLU_URL"] = stub_url(server)
+
+    # Модуль бота читает настройки из окружения при импорте.
+    from interesch import __main__ as bot
+    logging.disable(logging.WARNING)
+    bot.preload_morph()
+    try:
+        result = asyncio.run(run(bot, args))
+    finally:
+        server.shutdown()
+
+    result["meta"] = {
+        "commit": git_commit(),
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "scale": {"employees": args.employees, "events": args.events, "tasks": args.tasks},
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "nlu_delay": args.nlu_delay,
+        "nlu_cache": not args.no_nlu_cache,
+    }
+    report(result)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            found = regressions(result, json.load(f), args.threshold)
+        for line in found:
+            print(f"Регрессия: {line}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
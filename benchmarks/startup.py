@@ -0,0 +1,89 @@
+"""
+Бенчмарк запуска: время и RSS для `import interesch` и первого вызова lemmatize_entity_value,
+а также частная память воркеров, запущенных через fork с предзагрузкой словарей и без неё.
+Запуск: `python -m benchmarks.startup --workers 4` (замер памяти воркеров — только Linux).
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+
+PROBE = r"""
+import json, time
+def rss_kb():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+base = rss_kb()
+started = time.perf_counter()
+import interesch
+imported = time.perf_counter()
+after_import = rss_kb()
+interesch.lemmatize_entity_value("отдела разработки")
+lemmatized = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_lemmatize_ms": (lemmatized - imported) * 1000,
+    "import_rss_mb": (after_import - base) / 1024,
+    "first_lemmatize_rss_mb": (rss_kb() - after_import) / 1024,
+}))
+"""
+
+
+def private_memory_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        fields = dict(line.split(":", 1) for line in f if ":" in line)
+    return sum(int(fields[name].split()[0]) for name in ("Private_Clean", "Private_Dirty")) / 1024
+
+
+def fork_workers(workers: int, preload: bool) -> float:
+    """Запускает воркеры через fork и возвращает среднюю частную память воркера после лемматизации."""
+    from interesch import lemmatize_entity_value, preload_morph
+
+    if preload:
+        preload_morph()
+    pids = []
+    for _ in range(workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            lemmatize_entity_value("отдела разработки")
+            os.write(write_fd, b"1")
+            signal.pause()
+        os.close(write_fd)
+        os.read(read_fd, 1)
+        os.close(read_fd)
+        pids.append(pid)
+    try:
+        return sum(private_memory_mb(pid) for pid in pids) / workers
+    finally:
+        for pid in pids:
+            os.kill(pid, 9)
+            os.waitpid(pid, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    samples = [json.loads(subprocess.check_output([sys.executable, "-c", PROBE])) for _ in range(args.runs)]
+    for key in samples[0]:
+        values = sorted(sample[key] for sample in samples)
+        print(f"{key}: медиана {values[len(values) // 2]:.1f}")
+
+    if sys.platform.startswith("linux") and args.workers:
+        for preload in (False, True):
+            result = subprocess.check_output([
+                sys.executable, "-c",
+                f"from benchmarks.startup import fork_workers; print(fork_workers({args.workers}, {preload}))"
+            ])
+            title = "с предзагрузкой до fork" if preload else "без предзагрузки"
+            print(f"Частная память воркера ({title}): {float(result):.1f} МБ")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Локальная заглушка Rasa NLU для бенчмарков и ручной проверки бота.
+
+Отвечает на POST /model/parse в формате Rasa, определяя интент по ключевым словам,
+и на GET /status. Запуск: `python -m benchmarks.stub_nlu --port 5005 --delay 0.02`.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MODEL_ID = "stub-model"
+
+INTENT_KEYWORDS = [
+    ("greet", ("привет", "здравствуй")),
+    ("goodbye", ("пока", "до свидания")),
+    ("find_birthday", ("день рождения", "дни рождения")),
+    ("search_event", ("мероприят", "событи")),
+    ("check_task", ("задач",)),
+    ("search_person", ("найди", "кто такой")),
+]
+
+DATE_WORDS = ("сегодня", "завтра", "вчера", "на этой неделе", "на неделе", "в этом месяце")
+
+
+def parse_text(text: str) -> dict:
+    """Грубый разбор сообщения в ответ формата Rasa: интент по ключевым словам и простые сущности."""
+    text_lower = text.lower()
+    intent = "nlu_fallback"
+    for intent_name, keywords in INTENT_KEYWORDS:
+        if any(keyword in text_lower for keyword in keywords):
+            intent = intent_name
+            break
+
+    entities = []
+    for date_word in DATE_WORDS:
+        start = text_lower.find(date_word)
+        if start != -1:
+            entity_type = "birthday_specifier" if intent == "find_birthday" else "date"
+            entities.append({"entity": entity_type, "value": text[start:start + len(date_word)],
+                             "start": start, "end": start + len(date_word), "confidence_entity": 0.99})
+            break
+    if intent in ("search_person", "check_task"):
+        words = text.strip(" ?!.").split()
+        if len(words) > 1:
+            name = " ".join(words[1:3])
+            start = text.find(name)
+            entities.append({"entity": "name", "value": name, "start": start, "end": start + len(name),
+                             "confidence_entity": 0.95})
+
+    return {
+        "text": text,
+        "intent": {"name": intent, "confidence": 0.97},
+        "entities": entities,
+        "intent_ranking": [{"name": intent, "confidence": 0.97}],
+        "response_selector": {},
+    }
+
+
+class StubNluHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    delay = 0.0
+
+    def _send_json(self, payload: dict, status: int = 200):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/status":
+            self._send_json({"model_id": MODEL_ID, "model_file": f"{MODEL_ID}.tar.gz"})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path != "/model/parse":
+            self._send_json({"error": "not found"}, status=404)
+            return
+        if self.delay:
+            time.sleep(self.delay)
+        self._send_json(parse_text(request.get("text", "")))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0, delay: float = 0.0) -> ThreadingHTTPServer:
+    """Запускает заглушку в фоновом потоке и возвращает сервер (адрес — в server.server_address)."""
+    handler = type("ConfiguredStubNluHandler", (StubNluHandler,), {"delay": delay})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def stub_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/model/parse"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5005)
+    parser.add_argument("--delay", type=float, default=0.0, help="искусственная задержка ответа, с")
+    args = parser.parse_args()
+
+    server = start_stub_server(args.host, args.port, args.delay)
+    print(f"Заглушка NLU слушает {stub_url(server)}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
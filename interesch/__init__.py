@@ -1,5 +1,19 @@
-from .ai_request_processor import AiRequestProcessor
-from .database import Database
+from .ai_request_processor import AiRequestProcessor, AsyncAiRequestProcessor
+from .answer_cache import AnswerCache
+from .authorization import AuthorizationCache
+from .cache import LruTtlCache
+from .database import Database, AsyncDatabase
 from .database_query_parser import DbQueryParser
+from .date_expressions import DateRange, MonthDayRange, parse_date_range, parse_month_day_range
 from .db_response_parser import DbResponseParser
-from .text_normalizer import lemmatize_entity_value
+from .employee_directory import EmployeeDirectory
+from .query_cache import QueryResultCache
+from .rows import RECORD_TYPES, BirthdayRecord, EventRecord, PersonRecord, TaskRecord
+from .text_normalizer import (
+    lemmatize_entity_value,
+    lemmatize_many,
+    lemma_cache_info,
+    normalize_text,
+    preload_morph,
+    prepare_parser_payload,
+)
@@ -1,34 +1,71 @@
+import argparse
+import asyncio
+import contextlib
 import os
 import json
 import logging
+import random
+import secrets
 import textwrap
 
-import requests
-from telegram import Update, ReplyKeyboardMarkup
+import httpx
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update, ReplyKeyboardMarkup
 from telegram.constants import ParseMode
 from telegram.ext import (
     ApplicationBuilder,
+    CallbackQueryHandler,
     CommandHandler,
     MessageHandler,
     filters,
     ContextTypes,
 )
 
-from interesch import AiRequestProcessor, Database, DbQueryParser, DbResponseParser, lemmatize_entity_value
+from interesch import (
+    AnswerCache,
+    AsyncAiRequestProcessor,
+    AsyncDatabase,
+    AuthorizationCache,
+    DbQueryParser,
+    DbResponseParser,
+    EmployeeDirectory,
+    LruTtlCache,
+    QueryResultCache,
+    preload_morph,
+    prepare_parser_payload,
+)
+from interesch.authorization import ID_COLUMN as AUTHORIZATION_ID_COLUMN
+from interesch.database_query_parser import PAGE_KEY_COLUMNS, PAGE_SIZE
+from interesch.employee_directory import DIRECTORY_INTENTS
+from interesch.fast_path import FastPathClassifier
+from interesch.flow_control import RateLimiter, SingleFlight
+from interesch.metrics import serve_metrics, track_request
+from interesch.offline_request import OfflineRequest
+from interesch.page_state import LocalPageStates, PostgresPageStates
+from interesch.rows import RECORD_TYPES
+from interesch.update_processor import ChatOrderedUpdateProcessor
 
 
 DB_CONFIG_EXAMPLE = {
-    "dbname": "interesich",
-    "user": "cock_userr",
-    "password": "ifconfigroute-3n",
-    "host": "51.250.112.217",
-    "port": "5432"
+    "dbname": os.environ.get("DB_NAME", "interesich"),
+    "user": os.environ.get("DB_USER", "cock_userr"),
+    "password": os.environ.get("DB_PASSWORD", "ifconfigroute-3n"),
+    "host": os.environ.get("DB_HOST", "51.250.112.217"),
+    "port": os.environ.get("DB_PORT", "5432")
 }
 
-db = Database(**DB_CONFIG_EXAMPLE)
+# Кэш результатов SELECT в пуле соединений; по умолчанию выключен (QUERY_CACHE_BYTES=0).
+QUERY_CACHE_BYTES = int(os.environ.get("QUERY_CACHE_BYTES", 0))
+
+db = AsyncDatabase(
+    **DB_CONFIG_EXAMPLE,
+    min_size=int(os.environ.get("DB_POOL_MIN_SIZE", 1)),
+    max_size=int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+    result_cache=(QueryResultCache(max_bytes=QUERY_CACHE_BYTES, ttl=float(os.environ.get("QUERY_CACHE_TTL", 60)))
+                  if QUERY_CACHE_BYTES > 0 else None)
+)
 
-allowed_telegram_ids = db.execute_query(f"select * from \"Authentication\"", fetch=True)
-allowed_telegram_ids = [i[0] for i in allowed_telegram_ids]
+authorization = AuthorizationCache(refresh_interval=float(os.environ.get("AUTHORIZATION_REFRESH_INTERVAL", 300)),
+                                   id_column=os.environ.get("AUTHORIZATION_ID_COLUMN", AUTHORIZATION_ID_COLUMN))
 
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -36,10 +73,67 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-ai_request_processor = AiRequestProcessor(base_url="http://localhost:5005/model/parse")
+ai_request_processor = AsyncAiRequestProcessor(
+    base_url=os.environ.get("NLU_URL", "http://localhost:5005/model/parse"),
+    max_in_flight=int(os.environ.get("NLU_MAX_IN_FLIGHT", 20)),
+    cache=LruTtlCache(
+        maxsize=int(os.environ.get("NLU_CACHE_SIZE", 2048)),
+        ttl=float(os.environ.get("NLU_CACHE_TTL", 3600))
+    )
+)
+
+employee_directory = EmployeeDirectory(
+    refresh_interval=float(os.environ.get("DIRECTORY_REFRESH_INTERVAL", 600)),
+    max_staleness=float(os.environ.get("DIRECTORY_MAX_STALENESS", 1800))
+)
+
+# Простые сообщения разбираются правилами без Rasa; FAST_PATH=0 отключает.
+fast_path = (FastPathClassifier(employee_directory,
+                                min_confidence=float(os.environ.get("FAST_PATH_MIN_CONFIDENCE", 0.9)))
+             if os.environ.get("FAST_PATH", "1") != "0" else None)
+
+# Состояние кнопок "следующая страница": токен из callback_data -> (payload, ключ последней строки).
+# При нескольких репликах (webhook за балансировщиком) — PAGE_STATE_STORE=postgres, см. migrations/006.
+if os.environ.get("PAGE_STATE_STORE", "memory") == "postgres":
+    page_states = PostgresPageStates(db, ttl=float(os.environ.get("PAGE_STATE_TTL", 3600)))
+else:
+    page_states = LocalPageStates(
+        maxsize=int(os.environ.get("PAGE_STATE_CACHE_SIZE", 4096)),
+        ttl=float(os.environ.get("PAGE_STATE_TTL", 3600))
+    )
+PAGE_CALLBACK_PREFIX = "page:"
+
+# Не больше RATE_LIMIT_PER_MINUTE сообщений в минуту от пользователя, до RATE_LIMIT_BURST подряд; 0 — без ограничения.
+RATE_LIMIT_PER_MINUTE = float(os.environ.get("RATE_LIMIT_PER_MINUTE", 20))
+rate_limiter = (RateLimiter(rate=RATE_LIMIT_PER_MINUTE / 60, burst=int(os.environ.get("RATE_LIMIT_BURST", 5)))
+                if RATE_LIMIT_PER_MINUTE > 0 else None)
+# Кого уже предупредили об ограничении: повторные сообщения сверх лимита отбрасываются молча.
+rate_limit_notified = LruTtlCache(maxsize=4096, ttl=60)
+
+# Одновременные запросы с одинаковыми интентом и сущностями выполняются один раз.
+answers = SingleFlight()
+
+# Готовые ответы по тексту SQL и параметрам; ANSWER_CACHE_SIZE=0 отключает кэш.
+ANSWER_CACHE_SIZE = int(os.environ.get("ANSWER_CACHE_SIZE", 1024))
+# Ответ при ошибке запроса к БД — в кэш не попадает.
+DB_ERROR_ANSWER = (["По вашему запросу ничего не найдено."], None)
+answer_cache = (AnswerCache(maxsize=ANSWER_CACHE_SIZE, ttl=float(os.environ.get("ANSWER_CACHE_TTL", 600)))
+                if ANSWER_CACHE_SIZE > 0 else None)
+
+background_tasks = []
+
+DbQueryParser.name_search_mode = os.environ.get("NAME_SEARCH_MODE", "ilike")
 
 BOT_TOKEN = os.environ.get("BOT_TOKEN")
 
+# Полные ответы NLU и БД пишутся в лог только для этой доли сообщений (на уровне DEBUG — для всех).
+PAYLOAD_LOG_SAMPLE_RATE = float(os.environ.get("PAYLOAD_LOG_SAMPLE_RATE", 0.01))
+
+# Порт HTTP-сервера с метриками этапов (GET /metrics); 0 — не запускать.
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 0))
+metrics_servers = []
+
 reply_keyboard = [['/help']]
 markup = ReplyKeyboardMarkup(reply_keyboard, resize_keyboard=True)
 
@@ -51,7 +145,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 Добро пожаловать! Я помогу вам найти информацию о сотрудниках, мероприятиях, задачах и днях рождения. 
 Нажмите /help, чтобы узнать больше.
 
-{"Вы авторизованы как сотрудник" if user_id in allowed_telegram_ids else "Вы авторизованы как гость."}
+{"Вы авторизованы как сотрудник" if user_id in authorization else "Вы авторизованы как гость."}
 """,
         reply_markup=markup
     )
@@ -61,7 +155,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     help_text = """
 Вы можете спросить меня:
 - "Найди Волкова Андрея"
-- "Какие мероприятия на неделе?"
+- "Какие мероприятия на этой неделе?"
 - "У кого день рождения в июне?"
 - "Задачи Алексея"
 
@@ -73,15 +167,157 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 
+def sample_payload_log() -> bool:
+    return logger.isEnabledFor(logging.DEBUG) or random.random() < PAYLOAD_LOG_SAMPLE_RATE
+
+
+async def fetch_page(payload: dict, after: tuple | None = None,
+                     query: tuple | None = None) -> tuple[list, str | None] | None:
+    """
+    Страница мероприятий или задач, прочитанная через серверный курсор, и токен
+    следующей страницы (None, если страница последняя); None вместо пары — ошибка БД,
+    как у db.execute_query. query — уже построенный DbQueryParser.parse(payload, after), если он есть.
+    """
+    if query is None:
+        query = DbQueryParser.parse(payload, after)
+        if sample_payload_log():
+            logger.info(f"Сформирован SQL: {query[0]} с параметрами: {query[1]}")
+    sql_query, query_params = query
+    rows = []
+    stream = db.stream_query(sql_query, query_params, batch_size=PAGE_SIZE + 1,
+                             record_type=RECORD_TYPES[sql_query.intent])
+    try:
+        async with contextlib.aclosing(stream):
+            async for row in stream:
+                rows.append(row)
+    except Exception as e:
+        logger.error(f"Не удалось прочитать страницу из БД: {e}")
+        return None
+    if len(rows) <= PAGE_SIZE:
+        return rows, None
+    rows = rows[:PAGE_SIZE]
+    token = secrets.token_urlsafe(12)
+    await page_states.set(token, (payload, DbQueryParser.page_key(payload["intent"]["name"], rows[-1])))
+    return rows, token
+
+
+async def send_messages(message, texts: list[str], next_page: str | None = None):
+    """Отправляет части ответа по порядку; к последней добавляет кнопку следующей страницы."""
+    for index, text in enumerate(texts):
+        reply_markup = markup
+        if next_page and index == len(texts) - 1:
+            reply_markup = InlineKeyboardMarkup([[
+                InlineKeyboardButton("Следующая страница", callback_data=PAGE_CALLBACK_PREFIX + next_page)
+            ]])
+        await message.reply_text(text, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
+
+
+def rate_limited(user) -> bool:
+    return rate_limiter is not None and user is not None and not rate_limiter.allow(user.id)
+
+
+async def notify_rate_limited(message):
+    user_id = message.from_user.id
+    logger.info(f"Пользователь {user_id} превысил ограничение частоты запросов.")
+    if rate_limit_notified.get(user_id) is None:
+        rate_limit_notified.set(user_id, True)
+        await message.reply_text("Слишком много запросов. Подождите немного и повторите.", reply_markup=markup)
+
+
+async def notify_chat_overloaded(update: object):
+    """Ответ на обновление, отброшенное ChatOrderedUpdateProcessor из-за очереди чата."""
+    message = getattr(update, "message", None)
+    if message is not None and message.from_user is not None:
+        await notify_rate_limited(message)
+
+
+def answer_key(ai_response: dict) -> tuple:
+    """Ключ объединения запросов: интент и значения сущностей без позиций и уверенности модели."""
+    entities = tuple(sorted(
+        (str(entity.get("entity")), str(entity.get("value")).lower()) for entity in ai_response.get("entities") or []
+    ))
+    return ai_response.get("intent", {}).get("name"), entities
+
+
+async def build_answer(ai_response: dict, log_payload: bool) -> tuple[list[str], str | None]:
+    """Части ответа на запрос к данным и токен следующей страницы (None, если страниц больше нет)."""
+    intent_name = ai_response.get("intent", {}).get("name")
+    payload_for_db_parser = prepare_parser_payload(ai_response)
+
+    query_data = DbQueryParser.parse(payload_for_db_parser)
+
+    if isinstance(query_data, tuple):
+        sql_query, query_params = query_data
+    else:
+        sql_query = query_data
+        query_params = None
+
+    if log_payload:
+        logger.info(f"Сформирован SQL: {sql_query} с параметрами: {query_params}")
+
+    if answer_cache is None:
+        return await query_answer(payload_for_db_parser, intent_name, sql_query, query_params, log_payload)
+    cache_key = answer_cache.key(sql_query, query_params)
+    if intent_name in DIRECTORY_INTENTS:
+        # Ответ может прийти из снимка справочника, а он перечитывается уже после NOTIFY,
+        # когда версии таблиц в ключе выросли; поэтому в ключ входит и номер снимка.
+        cache_key += (employee_directory.generation,)
+    answer = answer_cache.get(cache_key)
+    if answer is None:
+        answer = await query_answer(payload_for_db_parser, intent_name, sql_query, query_params, log_payload)
+        if answer is not DB_ERROR_ANSWER:
+            answer_cache.set(cache_key, answer)
+    else:
+        logger.info("Ответ получен из кэша ответов.")
+    return answer
+
+
+async def query_answer(payload_for_db_parser: dict, intent_name: str, sql_query, query_params,
+                       log_payload: bool) -> tuple[list[str], str | None]:
+    if intent_name in PAGE_KEY_COLUMNS:
+        page = await fetch_page(payload_for_db_parser, query=(sql_query, query_params))
+        if page is None:
+            return DB_ERROR_ANSWER
+        rows, next_page = page
+        return DbResponseParser.parse_into_messages(rows), next_page
+
+    db_result = employee_directory.answer(payload_for_db_parser)
+    if db_result is not None:
+        logger.info("Ответ получен из снимка справочника сотрудников.")
+    else:
+        db_result = await db.execute_query(query=sql_query, params=query_params, fetch=True,
+                                           record_type=RECORD_TYPES[sql_query.intent])
+        if db_result is None:
+            return DB_ERROR_ANSWER
+
+    if not db_result:
+        logger.info("БД не вернула результатов.")
+        return ["По вашему запросу ничего не найдено."], None
+    if log_payload:
+        logger.info(f"Результат из БД: {db_result}")
+    return [DbResponseParser.parse_into_message(db_result)], None
+
+
 async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if rate_limited(update.message.from_user):
+        await notify_rate_limited(update.message)
+        return
+    with track_request() as timings:
+        await _handle_text(update, timings)
+
+
+async def _handle_text(update: Update, timings):
     original_text = update.message.text
-    db.ensure_connection()
+    log_payload = sample_payload_log()
 
     logger.info(f"Получен оригинальный запрос от пользователя: {original_text}")
 
     try:
-        ai_response = ai_request_processor.process_query(original_text)
+        ai_response = fast_path.classify(original_text) if fast_path is not None else None
+        if ai_response is None:
+            ai_response = await ai_request_processor.process_query(original_text)
         intent_name = ai_response.get("intent", {}).get("name")
+        timings.intent = intent_name
         if intent_name == 'greet':
             await update.message.reply_text("Привет! Задай вопрос и я что-нибудь найду.", reply_markup=markup,
                                             parse_mode=ParseMode.HTML)
@@ -97,66 +333,16 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text("Ты что-то отклонил.", reply_markup=markup, parse_mode=ParseMode.HTML)
             return
 
-        logger.info(
-            f"Ответ от NLU (на основе оригинального текста): {json.dumps(ai_response, ensure_ascii=False, indent=2)}"
-        )
-
-        entities_from_nlu = ai_response.get('entities', [])
-        entity_types_to_lemmatize_values = {
-            "department",
-            "skill",
-            "event_category",
-            "birthday_specifier",
-            "task_status",
-            "task_priority",
-            "task_tag",
-            "name"
-        }
-
-        processed_entities_for_parser = []
-        if entities_from_nlu:
-            for entity_data in entities_from_nlu:
-                entity_type = entity_data.get('entity')
-                original_value = entity_data.get('value')
-                current_entity = entity_data.copy()
-
-                if entity_type in entity_types_to_lemmatize_values and original_value:
-                    lemmatized_val = lemmatize_entity_value(original_value)
-                    if lemmatized_val != original_value:
-                        logger.info(
-                            f"Лемматизация значения сущности типа '{entity_type}': '{original_value}' -> '{lemmatized_val}'")
-                    current_entity['value'] = lemmatized_val
-
-                processed_entities_for_parser.append(current_entity)
-
-        payload_for_db_parser = {
-            "text": ai_response.get("text"),
-            "intent": ai_response.get("intent"),
-            "entities": processed_entities_for_parser,
-            "intent_ranking": ai_response.get("intent_ranking"),
-            "response_selector": ai_response.get("response_selector")
-        }
-
-        query_data = DbQueryParser.parse(payload_for_db_parser)
-
-        if isinstance(query_data, tuple):
-            sql_query, query_params = query_data
-        else:
-            sql_query = query_data
-            query_params = None
-
-        logger.info(f"Сформирован SQL: {sql_query} с параметрами: {query_params}")
-
-        db_result = db.execute_query(query=sql_query, params=query_params, fetch=True)
+        if log_payload:
+            logger.info(
+                "Ответ от NLU (на основе оригинального текста): "
+                f"{json.dumps(ai_response, ensure_ascii=False, indent=2)}"
+            )
 
-        if not db_result:
-            message = "По вашему запросу ничего не найдено."
-            logger.info("БД не вернула результатов.")
-        else:
-            logger.info(f"Результат из БД: {db_result}")
-            message = DbResponseParser.parse_into_message(db_result)
-
-    except requests.exceptions.RequestException as e:
+        texts, next_page = await answers.do(answer_key(ai_response), lambda: build_answer(ai_response, log_payload))
+        await send_messages(update.message, texts, next_page)
+        return
+    except httpx.HTTPError as e:
         logger.error(f"Ошибка при обращении к Rasa NLU API: {e}")
         message = "Извините, не удалось связаться с сервисом распознавания. Попробуйте позже."
     except ValueError as e:
@@ -170,15 +356,105 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(message, reply_markup=markup, parse_mode=ParseMode.HTML)
 
 
+async def handle_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    if rate_limited(query.from_user):
+        await query.answer("Слишком много запросов. Подождите немного и повторите.")
+        return
+    await query.answer()
+    state = await page_states.get(query.data.removeprefix(PAGE_CALLBACK_PREFIX))
+    if state is None:
+        await query.message.reply_text("Эта страница устарела, повторите запрос.", reply_markup=markup)
+        return
+    payload, after = state
+    with track_request() as timings:
+        timings.intent = payload["intent"]["name"]
+        try:
+            page = await fetch_page(payload, after)
+        except Exception as e:
+            logger.exception(f"Не удалось получить следующую страницу: {e}")
+            await query.message.reply_text("Произошла внутренняя ошибка. Пожалуйста, попробуйте позже.",
+                                           reply_markup=markup)
+            return
+        if page is None:
+            # Кнопка остаётся: страницу можно запросить ещё раз, когда БД станет доступна.
+            await send_messages(query.message, *DB_ERROR_ANSWER)
+            return
+        rows, next_page = page
+        await query.edit_message_reply_markup(reply_markup=None)
+        await send_messages(query.message, DbResponseParser.parse_into_messages(rows), next_page)
+
+
+async def post_init(app):
+    await db.open()
+    background_tasks.append(asyncio.create_task(authorization.run(db)))
+    if answer_cache is not None:
+        background_tasks.append(asyncio.create_task(answer_cache.subscribe(db)))
+    if db.result_cache is not None:
+        background_tasks.append(asyncio.create_task(db.result_cache.subscribe(db)))
+    background_tasks.append(asyncio.create_task(ai_request_processor.watch_model_version()))
+    background_tasks.append(asyncio.create_task(employee_directory.run(db)))
+    if METRICS_PORT:
+        metrics_servers.append(await serve_metrics(METRICS_HOST, METRICS_PORT))
+
+
+async def post_shutdown(app):
+    for task in background_tasks:
+        task.cancel()
+    for server in metrics_servers:
+        server.close()
+    logger.info(f"Статистика кэша NLU: {ai_request_processor.cache.stats.as_dict()}")
+    if fast_path is not None:
+        logger.info(f"Без обращения к Rasa разобрано: {fast_path.stats()}")
+    if db.result_cache is not None:
+        logger.info(f"Статистика кэша результатов запросов: {db.result_cache.stats.as_dict()}")
+    await ai_request_processor.close()
+    await db.close()
+
+
 def main():
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+    parser = argparse.ArgumentParser(description="Telegram-бот Интересыч.")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("UPDATE_WORKERS", 1)),
+                        help="сколько сообщений обрабатывать одновременно (порядок внутри чата сохраняется)")
+    parser.add_argument("--max-pending", type=int, default=int(os.environ.get("UPDATE_MAX_PENDING", 0)) or None,
+                        help="сколько сообщений принимать в работу, не дожидаясь воркеров (по умолчанию workers * 16)")
+    parser.add_argument("--max-pending-per-chat", type=int,
+                        default=int(os.environ.get("UPDATE_MAX_PENDING_PER_CHAT", 8)),
+                        help="сколько сообщений одного чата может ждать очереди; лишние отклоняются")
+    parser.add_argument("--mode", choices=("polling", "webhook"), default=os.environ.get("BOT_MODE", "polling"))
+    parser.add_argument("--host", default=os.environ.get("WEBHOOK_HOST", "0.0.0.0"), help="адрес webhook-сервера")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("WEBHOOK_PORT", 8080)))
+    parser.add_argument("--path", default=os.environ.get("WEBHOOK_PATH", "/telegram"))
+    parser.add_argument("--webhook-url", default=os.environ.get("WEBHOOK_URL"),
+                        help="публичный адрес для setWebhook; задаётся только у одной из реплик")
+    parser.add_argument("--secret-token", default=os.environ.get("WEBHOOK_SECRET_TOKEN"))
+    parser.add_argument("--offline", action="store_true",
+                        help="не обращаться к Bot API: ответы бота пишутся в лог (для локальной проверки)")
+    args = parser.parse_args()
+
+    token = BOT_TOKEN or ("0:offline" if args.offline else None)
+    builder = ApplicationBuilder().token(token).post_init(post_init).post_shutdown(post_shutdown)
+    if args.offline:
+        builder.request(OfflineRequest()).get_updates_request(OfflineRequest())
+    if args.mode == "webhook":
+        builder.updater(None)
+    if args.workers > 1:
+        builder.concurrent_updates(ChatOrderedUpdateProcessor(args.workers, args.max_pending, args.max_pending_per_chat,
+                                                              on_dropped=notify_chat_overloaded))
+    app = builder.build()
 
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("help", help_command))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text))
-
-    logger.info("Бот запущен...")
-    app.run_polling()
+    app.add_handler(CallbackQueryHandler(handle_page, pattern=f"^{PAGE_CALLBACK_PREFIX}"))
+
+    preload_morph()
+    logger.info(f"Бот запущен в режиме {args.mode} (воркеров: {args.workers})...")
+    if args.mode == "webhook":
+        from interesch.webhook import serve_webhook
+        asyncio.run(serve_webhook(app, args.host, args.port, args.path, args.webhook_url, args.secret_token))
+    else:
+        app.run_polling()
 
 
 if __name__ == '__main__':
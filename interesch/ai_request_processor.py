@@ -1,16 +1,113 @@
+import asyncio
+import copy
+import logging
+from urllib.parse import urljoin
+
+import httpx
 import requests
 
+from .cache import LruTtlCache
+from .flow_control import SingleFlight
+from .metrics import stage
+from .text_normalizer import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
 class AiRequestProcessor:
-    def __init__(self, base_url: str):
+    def __init__(self, base_url: str, connect_timeout: float = 3.0, read_timeout: float = 10.0):
         self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
 
+    @stage("nlu")
     def process_query(self, query: str) -> dict:
         payload = {"text": query}
         try:
-            response = requests.post(self.base_url, json=payload)
+            response = self.session.post(self.base_url, json=payload, timeout=self.timeout)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
-            print(f"Ошибка при обращении к Rasa NLU API: {e}")
+            logger.error(f"Ошибка при обращении к Rasa NLU API: {e}")
             raise
 
+
+class AsyncAiRequestProcessor:
+    """
+    Асинхронный клиент Rasa NLU: держит пул keep-alive соединений
+    и ограничивает число одновременных запросов к модели.
+    Если передан cache, ответы NLU кэшируются по нормализованному тексту сообщения
+    и сбрасываются при смене версии модели. Одновременные запросы с одинаковым
+    нормализованным текстом отправляются в модель один раз.
+    """
+
+    def __init__(self, base_url: str, connect_timeout: float = 3.0, read_timeout: float = 10.0,
+                 max_in_flight: int = 20, cache: LruTtlCache | None = None):
+        self.base_url = base_url
+        self.status_url = urljoin(base_url, "/status")
+        self.cache = cache
+        self.model_version = None
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._client = None
+        self.single_flight = SingleFlight()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    async def process_query(self, query: str) -> dict:
+        with stage("nlu"):
+            key = (self.model_version, normalize_text(query))
+            response = self.cache.get(key) if self.cache is not None else None
+            if response is None:
+                response = await self.single_flight.do(key, lambda: self._parse_and_cache(key, query))
+            return copy.deepcopy(response)
+
+    async def _parse_and_cache(self, key, query: str) -> dict:
+        response = await self._parse(query)
+        if self.cache is not None:
+            self.cache.set(key, response)
+        return response
+
+    async def _parse(self, query: str) -> dict:
+        payload = {"text": query}
+        async with self._in_flight:
+            try:
+                response = await self._get_client().post(self.base_url, json=payload)
+                response.raise_for_status()
+                return response.json()
+            except httpx.HTTPError as e:
+                logger.error(f"Ошибка при обращении к Rasa NLU API: {e}")
+                raise
+
+    async def refresh_model_version(self) -> str | None:
+        """Запрашивает версию загруженной модели и сбрасывает кэш, если она сменилась."""
+        response = await self._get_client().get(self.status_url)
+        response.raise_for_status()
+        status = response.json()
+        version = status.get("model_id") or status.get("model_file")
+        if version != self.model_version:
+            if self.cache is not None:
+                self.cache.clear()
+            self.model_version = version
+        return version
+
+    async def watch_model_version(self, interval: float = 60.0):
+        """Периодически проверяет версию модели; запускается отдельной задачей."""
+        while True:
+            try:
+                await self.refresh_model_version()
+            except httpx.HTTPError as e:
+                logger.warning(f"Не удалось получить версию модели Rasa: {e}")
+            except (ValueError, KeyError, AttributeError) as e:
+                # Тело /status не JSON или не того вида: задача не должна завершаться.
+                logger.warning(f"Некорректный ответ /status Rasa: {e!r}")
+            await asyncio.sleep(interval)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,52 @@
+"""
+Кэш готовых ответов бота по запросу DbQueryParser.parse (текст SQL + параметры).
+"""
+import datetime
+import logging
+
+from .cache import LruTtlCache, freeze_key
+from .database_query_parser import INTENT_TABLES
+from .notifications import DATA_CHANGED_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+
+def seconds_until_midnight(now: datetime.datetime | None = None) -> float:
+    now = now or datetime.datetime.now()
+    midnight = datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time.min)
+    return (midnight - now).total_seconds()
+
+
+class AnswerCache:
+    """
+    Ответы одинаковы для всех пользователей, пока не изменились таблицы запроса.
+    У каждой таблицы есть номер версии, который увеличивается по NOTIFY об её изменении
+    (migrations/002, 008); версии таблиц интента входят в ключ, поэтому после изменения
+    старые записи больше не находятся и вытесняются по LRU.
+    Относительные даты ("сегодня", "на этой неделе") превращаются в параметры запроса
+    по сегодняшней дате, поэтому записи живут не дольше, чем до полуночи.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 600):
+        self.cache = LruTtlCache(maxsize=maxsize, ttl=ttl)
+        self.ttl = ttl
+        self.versions = {}
+
+    def key(self, sql_query, params) -> tuple:
+        """Ключ с текущими версиями таблиц; берётся до выполнения запроса, чтобы не сохранить устаревший ответ."""
+        tables = INTENT_TABLES.get(getattr(sql_query, "intent", None), ())
+        text = getattr(sql_query, "name", None) or str(sql_query)
+        return text, freeze_key(params), tuple(self.versions.get(table, 0) for table in tables)
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, answer):
+        self.cache.set(key, answer, ttl=min(self.ttl, seconds_until_midnight()))
+
+    def invalidate(self, table_name: str):
+        self.versions[table_name] = self.versions.get(table_name, 0) + 1
+
+    async def subscribe(self, db):
+        """Подписывается на уведомления об изменении таблиц."""
+        await db.listen(DATA_CHANGED_CHANNEL, self.invalidate)
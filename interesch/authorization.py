@@ -0,0 +1,63 @@
+import asyncio
+import logging
+import time
+
+from .notifications import DATA_CHANGED_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+AUTHORIZATION_TABLE = "Authentication"
+ID_COLUMN = "TelegramId"
+
+
+class AuthorizationCache:
+    """
+    Множество Telegram ID сотрудников из таблицы "Authentication".
+    Проверка — `user_id in cache` за O(1) по frozenset, который целиком подменяется при обновлении.
+    Обновляется в фоне по таймеру и по NOTIFY (migrations/007); пока множество не загружено,
+    все пользователи считаются гостями, а запуск бота загрузки не ждёт.
+    """
+
+    def __init__(self, refresh_interval: float = 300, retry_interval: float = 10, id_column: str = ID_COLUMN):
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self.id_column = id_column
+        self.loaded_at = None
+        self._ids = frozenset()
+        self._changed = asyncio.Event()
+
+    def __contains__(self, user_id) -> bool:
+        return user_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def load(self, rows):
+        self._ids = frozenset(row[0] for row in rows)
+        self.loaded_at = time.monotonic()
+
+    async def refresh(self, db) -> bool:
+        column = self.id_column.replace('"', '""')
+        rows = await db.execute_query(f'SELECT "{column}" FROM "{AUTHORIZATION_TABLE}"', fetch=True)
+        if rows is None:
+            logger.warning("Не удалось обновить список авторизованных пользователей.")
+            return False
+        self.load(rows)
+        logger.info(f"Список авторизованных пользователей обновлён: {len(self._ids)} записей.")
+        return True
+
+    async def run(self, db):
+        """Фоновое обновление: по таймеру, по NOTIFY об изменении таблицы и с коротким повтором после ошибки."""
+        await db.listen(DATA_CHANGED_CHANNEL, self._on_data_changed)
+        while True:
+            refreshed = await self.refresh(db)
+            try:
+                await asyncio.wait_for(self._changed.wait(),
+                                       timeout=self.refresh_interval if refreshed else self.retry_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._changed.clear()
+
+    def _on_data_changed(self, table_name: str):
+        if table_name == AUTHORIZATION_TABLE:
+            self._changed.set()
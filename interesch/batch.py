@@ -0,0 +1,133 @@
+"""
+Пакетный разбор сообщений: NLU -> лемматизация -> DbQueryParser.parse -> SQL.
+
+Используется для прогона накопленных логов через весь конвейер без Telegram и базы данных:
+`python -m interesch.batch < messages.jsonl > parsed.jsonl`.
+Каждая строка входа — JSON-объект с полем "text" (остальные поля переносятся в ответ как есть)
+или просто JSON-строка с текстом сообщения. Ошибка одного сообщения (или некорректная строка входа)
+попадает в поле "error" его записи и не останавливает разбор остальных.
+"""
+import argparse
+import asyncio
+import collections
+import json
+import logging
+import sys
+from typing import AsyncIterator, Iterable
+
+import httpx
+
+from .ai_request_processor import AsyncAiRequestProcessor
+from .database_query_parser import DbQueryParser
+from .text_normalizer import prepare_parser_payload
+
+logger = logging.getLogger(__name__)
+
+# Служебное поле записи входа с ошибкой разбора строки.
+INPUT_ERROR = "_input_error"
+
+
+async def parse_message(processor: AsyncAiRequestProcessor, text: str, retries: int = 2,
+                        retry_delay: float = 0.5) -> dict:
+    """Прогоняет одно сообщение через конвейер, повторяя запрос к NLU при сетевых ошибках."""
+    result = {"text": text, "intent": None, "entities": [], "sql": None, "params": None, "error": None}
+    if not isinstance(text, str):
+        result["error"] = "в записи нет текста сообщения"
+        return result
+    for attempt in range(retries + 1):
+        try:
+            ai_response = await processor.process_query(text)
+            break
+        except httpx.HTTPError as e:
+            if attempt == retries:
+                result["error"] = f"NLU: {e}"
+                return result
+            await asyncio.sleep(retry_delay * 2 ** attempt)
+        except Exception as e:
+            # Например, ответ NLU не в JSON: ошибка остаётся ошибкой этого сообщения.
+            result["error"] = f"NLU: {type(e).__name__}: {e}"
+            return result
+
+    try:
+        payload = prepare_parser_payload(ai_response)
+        result["intent"] = (payload.get("intent") or {}).get("name")
+        result["entities"] = payload["entities"]
+        sql_query, query_params = DbQueryParser.parse(payload)
+    except ValueError as e:
+        result["error"] = str(e)
+        return result
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        return result
+    result["sql"] = sql_query.as_string(None)
+    result["params"] = query_params
+    return result
+
+
+async def parse_batch(processor: AsyncAiRequestProcessor, texts: Iterable[str], concurrency: int = 8,
+                      retries: int = 2, retry_delay: float = 0.5) -> AsyncIterator[dict]:
+    """
+    Разбирает сообщения параллельно (не более concurrency одновременно)
+    и отдаёт результаты по мере готовности в порядке входа.
+    """
+    pending = collections.deque()
+    try:
+        for text in texts:
+            pending.append(asyncio.create_task(parse_message(processor, text, retries, retry_delay)))
+            if len(pending) >= concurrency:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def _read_records(lines: Iterable[str]) -> Iterable[dict]:
+    """Записи входа; некорректная строка даёт запись без текста с ошибкой в INPUT_ERROR."""
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield {"line": number, INPUT_ERROR: f"строка {number}: некорректный JSON ({e})"}
+            continue
+        yield record if isinstance(record, dict) else {"text": record}
+
+
+async def run(args: argparse.Namespace):
+    processor = AsyncAiRequestProcessor(base_url=args.nlu_url, max_in_flight=args.concurrency)
+    records = collections.deque()
+
+    def texts():
+        for record in _read_records(sys.stdin):
+            records.append(record)
+            yield record.get("text")
+
+    try:
+        async for result in parse_batch(processor, texts(), args.concurrency, args.retries):
+            record = records.popleft()
+            input_error = record.pop(INPUT_ERROR, None)
+            output = {**record, **result}
+            if input_error:
+                output["error"] = input_error
+            sys.stdout.write(json.dumps(output, ensure_ascii=False, default=str) + "\n")
+    finally:
+        await processor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетный разбор сообщений из JSONL на stdin.")
+    parser.add_argument("--nlu-url", default="http://localhost:5005/model/parse")
+    parser.add_argument("--concurrency", type=int, default=8, help="число одновременных запросов к NLU")
+    parser.add_argument("--retries", type=int, default=2, help="повторов на сообщение при ошибке NLU")
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import time
+from collections import OrderedDict
+
+
+def freeze_key(value):
+    """Хешируемый вид значения для ключа кэша: списки и кортежи — кортежи, словари — отсортированные пары."""
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze_key(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze_key(item)) for key, item in value.items()))
+    return value
+
+
+class CacheStats:
+    __slots__ = ("hits", "misses", "evictions", "expirations")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class LruTtlCache:
+    """
+    LRU-кэш с ограничением по числу записей и временем жизни записей.
+    Не потокобезопасен: рассчитан на использование из одного цикла событий.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        item = self._data.get(key)
+        if item is None:
+            self.stats.misses += 1
+            return default
+        expires_at, value = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def set(self, key, value, ttl: float | None = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.stats.evictions += 1
+
+    def pop(self, key, default=None):
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
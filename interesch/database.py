@@ -1,10 +1,24 @@
+import asyncio
+import collections
+import contextlib
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, connection as PgConnection
 from psycopg2.extras import DictCursor
 from psycopg2 import OperationalError
 
+from .metrics import stage
+from .query_cache import QueryResultCache, written_tables
+from .query_plan_cache import QueryPlan
+from .rows import build_records, column_names, record_factory
+
 
 class Database:
-    def __init__(self, dbname, user, password, host="localhost", port="5432"):
+    def __init__(self, dbname, user, password, host="localhost", port="5432",
+                 result_cache: QueryResultCache | None = None):
         self.db_config = {
             "dbname": dbname,
             "user": user,
@@ -14,6 +28,9 @@ class Database:
         }
         self.conn = None
         self.cursor = None
+        self.result_cache = result_cache
+        self._transaction_depth = 0
+        self._written_tables = set()
         self.connect()
 
     def connect(self):
@@ -37,16 +54,70 @@ class Database:
             print(f"Ошибка соединения: {e}. Попытка переподключения...")
             self.connect()
 
-    def execute_query(self, query, params=None, fetch=False):
-        """Выполняет SQL-запрос с обеспечением стабильности соединения."""
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Выполняет запросы блока в одной транзакции: фиксирует её в конце блока и откатывает при исключении.
+        Ошибки запросов внутри блока пробрасываются, а чтения идут мимо кэша результатов.
+        """
+        self.ensure_connection()
+        if self._transaction_depth == 0:
+            self.conn.rollback()  # закрываем неявную транзакцию предыдущих чтений
+        self._transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            if self._transaction_depth == 1:
+                self.conn.rollback()
+                self._written_tables.clear()
+            raise
+        else:
+            if self._transaction_depth == 1:
+                self.conn.commit()
+                self._invalidate_written()
+        finally:
+            self._transaction_depth -= 1
+
+    def _invalidate_written(self):
+        if self.result_cache is not None:
+            for table in self._written_tables:
+                self.result_cache.invalidate(table)
+        self._written_tables.clear()
+
+    @stage("db")
+    def execute_query(self, query, params=None, fetch=False, record_type=None):
+        """
+        Выполняет SQL-запрос с обеспечением стабильности соединения; с record_type строки возвращаются
+        записями из rows.py, как у AsyncDatabase.
+        С result_cache чтения вне transaction() берутся из кэша, а записи сбрасывают кэш по своим таблицам.
+        """
+        cache_key = None
+        if self.result_cache is not None and fetch and not self._transaction_depth:
+            cache_key = self.result_cache.key(query, params, record_type)
+            if cache_key is not None:
+                cached = self.result_cache.get(cache_key)
+                if cached is not None:
+                    return cached
         try:
             self.ensure_connection()
             self.cursor.execute(query, params)
+            if self.result_cache is not None and cache_key is None:
+                self._written_tables.update(written_tables(query))
             if fetch:
-                return self.cursor.fetchall()
-            self.conn.commit()
+                result = self.cursor.fetchall()
+                if record_type:
+                    result = build_records(record_type, self.cursor.description, result)
+                if cache_key is not None:
+                    self.result_cache.set(cache_key, result)
+                return result
+            if not self._transaction_depth:
+                self.conn.commit()
+                self._invalidate_written()
         except Exception as e:
+            if self._transaction_depth:
+                raise
             self.conn.rollback()
+            self._written_tables.clear()
             print(f"Ошибка выполнения запроса: {e}")
             return None
 
@@ -59,3 +130,309 @@ class Database:
 
     def __del__(self):
         self.close()
+
+
+class PooledConnection(PgConnection):
+    """Соединение пула, которое помнит подготовленные на нём запросы (имя -> None, в порядке LRU)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = collections.OrderedDict()
+
+
+class AsyncDatabase:
+    """
+    Асинхронный пул соединений с базой данных.
+    Соединения psycopg2 выдаются на время одного запроса, а сами запросы
+    выполняются в отдельных потоках, поэтому медленный запрос не блокирует
+    цикл событий бота.
+    """
+
+    def __init__(self, dbname, user, password, host="localhost", port="5432",
+                 min_size=1, max_size=10, connect_timeout=5, statement_timeout=30,
+                 acquire_timeout=10, health_check_interval=30, prepare_statements=True,
+                 max_prepared_statements=256, result_cache: QueryResultCache | None = None):
+        self.db_config = {
+            "dbname": dbname,
+            "user": user,
+            "password": password,
+            "host": host,
+            "port": port,
+            "connect_timeout": connect_timeout,
+            "options": f"-c statement_timeout={int(statement_timeout * 1000)}"
+        }
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self.prepare_statements = prepare_statements
+        self.max_prepared_statements = max_prepared_statements
+        self.result_cache = result_cache
+        self._idle = collections.deque()
+        self._slots = None
+        self._executor = None
+        self._listen_conn = None
+        self._listen_fd = None
+        self._listeners = {}
+        self._relisten_task = None
+        self._listen_lock = None
+        self._stream_names = itertools.count(1)
+
+    async def open(self):
+        """Создаёт пул и заранее открывает min_size соединений."""
+        self._slots = asyncio.Semaphore(self.max_size)
+        self._listen_lock = asyncio.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_size, thread_name_prefix="interesch-db")
+        for _ in range(self.min_size):
+            try:
+                conn = await self._run(self._connect)
+            except Exception as e:
+                print(f"Ошибка подключения к базе данных: {e}")
+                break
+            self._idle.append((conn, time.monotonic()))
+        print(f"Пул соединений с базой данных открыт ({len(self._idle)}/{self.max_size}).")
+
+    async def close(self):
+        if self._relisten_task is not None:
+            self._relisten_task.cancel()
+        self._close_listen_connection()
+        while self._idle:
+            conn, _ = self._idle.popleft()
+            conn.close()
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        print("Пул соединений с базой данных закрыт.")
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _connect(self):
+        return psycopg2.connect(**self.db_config, connection_factory=PooledConnection)
+
+    @staticmethod
+    def _is_alive(conn):
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error as e:
+            print(f"Соединение из пула не прошло проверку: {e}. Открываем новое...")
+            conn.close()
+            return False
+
+    async def _checkout(self):
+        """Берёт свободное соединение, проверяя давно простаивавшие, или открывает новое."""
+        while self._idle:
+            conn, last_used = self._idle.pop()
+            if conn.closed != 0:
+                continue
+            if time.monotonic() - last_used < self.health_check_interval:
+                return conn
+            if await self._run(self._is_alive, conn):
+                return conn
+        return await self._run(self._connect)
+
+    @staticmethod
+    def _discard(conn):
+        if conn.closed == 0:
+            conn.cancel()
+            conn.close()
+
+    def _checkin(self, conn):
+        if conn.closed != 0:
+            return
+        if conn.info.transaction_status != TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                conn.close()
+                return
+        self._idle.append((conn, time.monotonic()))
+
+    @contextlib.asynccontextmanager
+    async def connection(self):
+        """Выдаёт соединение из пула на время блока и затем возвращает его обратно."""
+        if self._slots is None:
+            raise RuntimeError("Пул соединений не открыт.")
+        await asyncio.wait_for(self._slots.acquire(), self.acquire_timeout)
+        try:
+            conn = await self._checkout()
+            try:
+                yield conn
+            except psycopg2.Error:
+                self._checkin(conn)
+                raise
+            except BaseException:
+                # Поток пула может всё ещё работать с соединением (например, при отмене задачи),
+                # поэтому в пул его не возвращаем.
+                self._executor.submit(self._discard, conn)
+                raise
+            else:
+                self._checkin(conn)
+        finally:
+            self._slots.release()
+
+    def _execute_prepared(self, conn, cursor, plan: QueryPlan, params):
+        """Выполняет QueryPlan через PREPARE/EXECUTE, подготавливая его на соединении при первом вызове."""
+        if plan.name in conn.prepared:
+            conn.prepared.move_to_end(plan.name)
+        else:
+            cursor.execute(plan.prepare_statement())
+            conn.prepared[plan.name] = None
+            while len(conn.prepared) > self.max_prepared_statements:
+                stale_name, _ = conn.prepared.popitem(last=False)
+                cursor.execute(f"DEALLOCATE {stale_name}")
+        cursor.execute(plan.execute_statement(), params)
+
+    def _execute(self, conn, query, params, fetch, record_type=None):
+        try:
+            with conn.cursor(cursor_factory=None if record_type else DictCursor) as cursor:
+                if self.prepare_statements and isinstance(query, QueryPlan):
+                    self._execute_prepared(conn, cursor, query, params)
+                else:
+                    cursor.execute(query, params)
+                result = cursor.fetchall() if fetch else None
+                if result is not None and record_type:
+                    result = build_records(record_type, cursor.description, result)
+            conn.commit()
+            return result
+        except Exception:
+            if conn.closed == 0:
+                conn.rollback()
+                if conn.prepared:
+                    # после ошибки не полагаемся на то, какие из подготовленных запросов пережили откат
+                    conn.prepared.clear()
+                    try:
+                        with conn.cursor() as cursor:
+                            cursor.execute("DEALLOCATE ALL")
+                        conn.commit()
+                    except psycopg2.Error:
+                        conn.close()
+            raise
+
+    @staticmethod
+    def _open_stream(conn, name, query, params, batch_size, record_type):
+        cursor = conn.cursor(name=name, cursor_factory=None if record_type else DictCursor)
+        cursor.itersize = batch_size
+        cursor.execute(query, params)
+        return cursor
+
+    @staticmethod
+    def _close_stream(conn, cursor):
+        cursor.close()
+        conn.commit()
+
+    async def stream_query(self, query, params=None, batch_size=50, record_type=None):
+        """
+        Выполняет запрос через серверный (именованный) курсор и отдаёт строки по мере чтения,
+        забирая их у сервера пачками по batch_size. Соединение занято, пока генератор не
+        исчерпан или не закрыт; если потребитель остановился раньше, курсор закрывается,
+        а соединение возвращается в пул. С record_type строки отдаются записями из rows.py.
+        """
+        with stage("db"):
+            async with self.connection() as conn:
+                cursor = await self._run(self._open_stream, conn, f"interesch_stream_{next(self._stream_names)}",
+                                         query, params, batch_size, record_type)
+                make_record = None
+                try:
+                    while rows := await self._run(cursor.fetchmany, batch_size):
+                        if record_type and make_record is None:
+                            # у именованного курсора описание столбцов появляется после первого чтения
+                            make_record = record_factory(record_type, column_names(cursor.description))
+                        for row in rows:
+                            yield make_record(row) if make_record else row
+                except GeneratorExit:
+                    await self._run(self._close_stream, conn, cursor)
+                    return
+                await self._run(self._close_stream, conn, cursor)
+
+    async def listen(self, channel: str, callback):
+        """
+        Подписывает callback(payload) на NOTIFY канала channel. Все подписки обслуживает одно
+        отдельное соединение вне пула; при его потере подписки восстанавливаются автоматически.
+        """
+        self._listeners.setdefault(channel, []).append(callback)
+        async with self._listen_lock:
+            try:
+                if self._listen_conn is None:
+                    if self._relisten_task is None or self._relisten_task.done():
+                        await self._open_listen_connection()
+                elif len(self._listeners[channel]) == 1:
+                    await self._run(self._execute_listen, self._listen_conn, [channel])
+            except psycopg2.Error as e:
+                print(f"Не удалось подписаться на уведомления {channel}: {e}")
+                self._schedule_relisten()
+
+    @staticmethod
+    def _execute_listen(conn, channels):
+        with conn.cursor() as cursor:
+            for channel in channels:
+                cursor.execute(f'LISTEN "{channel}"')
+
+    async def _open_listen_connection(self):
+        conn = await self._run(self._connect)
+        conn.autocommit = True
+        await self._run(self._execute_listen, conn, list(self._listeners))
+        self._listen_conn, self._listen_fd = conn, conn.fileno()
+        asyncio.get_running_loop().add_reader(self._listen_fd, self._on_listen_readable)
+
+    def _on_listen_readable(self):
+        conn = self._listen_conn
+        try:
+            conn.poll()
+        except psycopg2.Error as e:
+            print(f"Соединение для уведомлений потеряно: {e}. Переподключение...")
+            self._close_listen_connection()
+            self._schedule_relisten()
+            return
+        while conn.notifies:
+            notify = conn.notifies.pop(0)
+            for callback in self._listeners.get(notify.channel, []):
+                callback(notify.payload)
+
+    def _close_listen_connection(self):
+        if self._listen_conn is not None:
+            asyncio.get_running_loop().remove_reader(self._listen_fd)
+            self._listen_conn.close()
+            self._listen_conn = self._listen_fd = None
+
+    def _schedule_relisten(self, delay: float = 5.0):
+        if self._relisten_task is not None and not self._relisten_task.done():
+            return
+
+        async def relisten():
+            while self._listen_conn is None and self._executor is not None:
+                await asyncio.sleep(delay)
+                try:
+                    async with self._listen_lock:
+                        await self._open_listen_connection()
+                except psycopg2.Error as e:
+                    print(f"Не удалось восстановить подписку на уведомления: {e}")
+
+        self._relisten_task = asyncio.get_running_loop().create_task(relisten())
+
+    async def execute_query(self, query, params=None, fetch=False, record_type=None):
+        """
+        Выполняет SQL-запрос на соединении из пула; с record_type строки возвращаются записями из rows.py.
+        Каждый запрос — отдельная транзакция, поэтому с result_cache мимо кэша идут только записи.
+        """
+        cache = self.result_cache
+        cache_key = cache.key(query, params, record_type) if cache is not None and fetch else None
+        try:
+            with stage("db"):
+                if cache_key is not None:
+                    cached = cache.get(cache_key)
+                    if cached is not None:
+                        return cached
+                async with self.connection() as conn:
+                    result = await self._run(self._execute, conn, query, params, fetch, record_type)
+        except Exception as e:
+            print(f"Ошибка выполнения запроса: {e}")
+            return None
+        if cache_key is not None:
+            cache.set(cache_key, result)
+        elif cache is not None:
+            cache.invalidate_written(query)
+        return result
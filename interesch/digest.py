@@ -0,0 +1,193 @@
+"""
+Рассылка дайджестов в чаты Telegram: дни рождения сегодня по отделам и мероприятия этой недели.
+
+Каждый отчёт — один запрос DbQueryParser.digest с теми же фильтрами, что и у бота, но без LIMIT;
+строки группируются по отделу за один проход и отрисовываются DbResponseParser.
+Запуск: `python -m interesch.digest --chats chats.json` (BOT_TOKEN и DB_* — из окружения, как у бота),
+`--dry-run out/` вместо отправки пишет сообщения каждого чата в out/<chat_id>.html.
+
+chats.json:
+    {"birthdays": {"Отдел разработки": [-1001], "*": [-1002]}, "events": [-1002]}
+Чаты из "*" получают дни рождения всех отделов.
+"""
+import argparse
+import asyncio
+import datetime
+import itertools
+import json
+import logging
+import os
+import pathlib
+
+from telegram import Bot
+from telegram.constants import ParseMode
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+
+from .database import AsyncDatabase
+from .database_query_parser import DbQueryParser
+from .db_response_parser import MESSAGE_LIMIT, DbResponseParser
+from .rows import RECORD_TYPES
+
+logger = logging.getLogger(__name__)
+
+ALL_DEPARTMENTS = "*"
+NO_DEPARTMENT = "Без отдела"
+
+BIRTHDAYS_PAYLOAD = {"intent": {"name": "find_birthday"},
+                     "entities": [{"entity": "birthday_specifier", "value": "сегодня"}]}
+EVENTS_PAYLOAD = {"intent": {"name": "search_event"}, "entities": [{"entity": "date", "value": "на этой неделе"}]}
+
+MESSAGE_SEPARATOR = "\n\n<!-- ---------------------------------------- -->\n\n"
+
+
+def render_report(title: str, rows: list) -> list[str]:
+    """Сообщения отчёта: заголовок и строки, отрисованные DbResponseParser и разбитые по MESSAGE_LIMIT."""
+    heading = f"<b>{title}</b>\n"
+    messages = DbResponseParser.parse_into_messages(rows, limit=MESSAGE_LIMIT - len(heading))
+    messages[0] = heading + messages[0]
+    return messages
+
+
+async def fetch_report(db: AsyncDatabase, payload: dict) -> list | None:
+    sql_query, query_params = DbQueryParser.digest(payload)
+    return await db.execute_query(sql_query, query_params, fetch=True, record_type=RECORD_TYPES[sql_query.intent])
+
+
+async def build_deliveries(db: AsyncDatabase, chats: dict, today: datetime.date) -> dict[int, list[str]]:
+    """Сообщения для каждого чата из chats.json; пустые отчёты не отправляются."""
+    deliveries = {}
+    birthday_chats = chats.get("birthdays") or {}
+    if birthday_chats:
+        rows = await fetch_report(db, BIRTHDAYS_PAYLOAD)
+        if rows is None:
+            raise RuntimeError("Не удалось получить дни рождения.")
+        # Строки отсортированы по отделу, поэтому группировка — один проход.
+        for department, group in itertools.groupby(rows, key=lambda row: row.department_name or NO_DEPARTMENT):
+            messages = render_report(f"Дни рождения {today:%d.%m.%Y} — {department}", list(group))
+            for chat_id in [*birthday_chats.get(department, ()), *birthday_chats.get(ALL_DEPARTMENTS, ())]:
+                deliveries.setdefault(chat_id, []).extend(messages)
+        logger.info(f"Дней рождения сегодня: {len(rows)}.")
+
+    event_chats = chats.get("events") or []
+    if event_chats:
+        rows = await fetch_report(db, EVENTS_PAYLOAD)
+        if rows is None:
+            raise RuntimeError("Не удалось получить мероприятия.")
+        if rows:
+            messages = render_report("Мероприятия на этой неделе", rows)
+            for chat_id in event_chats:
+                deliveries.setdefault(chat_id, []).extend(messages)
+        logger.info(f"Мероприятий на этой неделе: {len(rows)}.")
+    return deliveries
+
+
+def _seconds(value) -> float:
+    return value.total_seconds() if isinstance(value, datetime.timedelta) else float(value)
+
+
+class DigestSender:
+    """
+    Отправка сообщений через Bot API: не больше concurrency запросов одновременно, сообщения одного чата
+    по порядку и не чаще раза в chat_interval секунд. RetryAfter (flood limit) приостанавливает все отправки
+    на указанное Telegram время; сетевые ошибки повторяются до retries раз.
+    """
+
+    def __init__(self, bot: Bot, concurrency: int = 8, chat_interval: float = 1.0, retries: int = 3):
+        self.bot = bot
+        self.chat_interval = chat_interval
+        self.retries = retries
+        self._slots = asyncio.Semaphore(concurrency)
+        self._resume_at = 0.0
+        self.sent = 0
+        self.failed_chats = []
+
+    async def send_all(self, deliveries: dict[int, list[str]]):
+        await asyncio.gather(*(self._send_chat(chat_id, texts) for chat_id, texts in deliveries.items()))
+
+    async def _send_chat(self, chat_id: int, texts: list[str]):
+        for index, text in enumerate(texts):
+            if index:
+                await asyncio.sleep(self.chat_interval)
+            if not await self._send(chat_id, text):
+                self.failed_chats.append(chat_id)
+                return
+
+    async def _send(self, chat_id: int, text: str) -> bool:
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            await asyncio.sleep(max(0.0, self._resume_at - loop.time()))
+            try:
+                async with self._slots:
+                    await self.bot.send_message(chat_id, text, parse_mode=ParseMode.HTML)
+                self.sent += 1
+                return True
+            except RetryAfter as e:
+                delay = _seconds(e.retry_after)
+                logger.warning(f"Ограничение частоты Telegram, пауза {delay:.0f} с.")
+                self._resume_at = max(self._resume_at, loop.time() + delay)
+            except (Forbidden, BadRequest) as e:
+                logger.error(f"Не удалось отправить дайджест в чат {chat_id}: {e}")
+                return False
+            except NetworkError as e:
+                attempt += 1
+                if attempt > self.retries:
+                    logger.error(f"Не удалось отправить дайджест в чат {chat_id}: {e}")
+                    return False
+                await asyncio.sleep(2 ** attempt)
+
+
+def write_deliveries(directory: pathlib.Path, deliveries: dict[int, list[str]]):
+    directory.mkdir(parents=True, exist_ok=True)
+    for chat_id, texts in deliveries.items():
+        (directory / f"{chat_id}.html").write_text(MESSAGE_SEPARATOR.join(texts) + "\n", encoding="utf-8")
+    logger.info(f"Дайджесты для {len(deliveries)} чатов записаны в {directory}.")
+
+
+async def run(args: argparse.Namespace):
+    with open(args.chats, encoding="utf-8") as f:
+        chats = json.load(f)
+    db = AsyncDatabase(
+        dbname=os.environ.get("DB_NAME"),
+        user=os.environ.get("DB_USER"),
+        password=os.environ.get("DB_PASSWORD"),
+        host=os.environ.get("DB_HOST", "localhost"),
+        port=os.environ.get("DB_PORT", "5432"),
+        min_size=1,
+        max_size=2,
+    )
+    await db.open()
+    try:
+        deliveries = await build_deliveries(db, chats, datetime.date.today())
+    finally:
+        await db.close()
+
+    if args.dry_run:
+        write_deliveries(pathlib.Path(args.dry_run), deliveries)
+        return
+    token = os.environ.get("BOT_TOKEN")
+    if not token:
+        raise SystemExit("Не задан BOT_TOKEN.")
+    async with Bot(token) as bot:
+        sender = DigestSender(bot, args.concurrency, args.chat_interval, args.retries)
+        await sender.send_all(deliveries)
+    logger.info(f"Отправлено сообщений: {sender.sent}, чатов с ошибкой: {len(sender.failed_chats)}.")
+    if sender.failed_chats:
+        raise SystemExit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Рассылка дайджестов: дни рождения сегодня и мероприятия недели.")
+    parser.add_argument("--chats", required=True, help="JSON с чатами для отчётов")
+    parser.add_argument("--dry-run", metavar="DIR", help="не отправлять, а записать сообщения в DIR/<chat_id>.html")
+    parser.add_argument("--concurrency", type=int, default=8, help="число одновременных запросов к Bot API")
+    parser.add_argument("--chat-interval", type=float, default=1.0, help="пауза между сообщениями одного чата, с")
+    parser.add_argument("--retries", type=int, default=3, help="повторов при сетевых ошибках")
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
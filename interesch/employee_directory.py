@@ -0,0 +1,256 @@
+import asyncio
+import datetime
+import logging
+import time
+
+from .database_query_parser import DbQueryParser
+from .date_expressions import parse_month_day_range
+from .notifications import DATA_CHANGED_CHANNEL
+from .rows import BirthdayRecord, PersonRecord
+from .text_normalizer import lemmatize_word, normalize_text
+
+logger = logging.getLogger(__name__)
+
+DIRECTORY_TABLES = {"Employees", "Languages", "Rank", "Project", "Department"}
+# Интенты, на которые answer() может ответить из снимка.
+DIRECTORY_INTENTS = ("search_person", "find_birthday")
+# Длина n-грамм в индексе подстрок имён и фамилий.
+NGRAM_SIZE = 3
+
+SNAPSHOT_QUERY = " ".join([
+    "SELECT",
+    ", ".join([
+        'emp."Employee_Id"',
+        'emp."Surname"', 'emp."Name"', 'emp."Father"',
+        'emp."Birthday"', 'emp."FirstDay"',
+        'lng."Name" AS "LanguageName"',
+        'rnk."Status" AS "RankStatus"',
+        'prj."Name" AS "ProjectName"',
+        'dprt."Name" AS "DepartmentName"',
+        'emp."Contacts"'
+    ]),
+    'FROM "Employees" AS emp',
+    'LEFT JOIN "Languages" AS lng ON lng."Language_Id" = emp."LanguageId"',
+    'LEFT JOIN "Rank" AS rnk ON rnk."Rank_Id" = emp."RankId"',
+    'LEFT JOIN "Project" AS prj ON prj."Project_Id" = emp."ProjectId"',
+    'LEFT JOIN "Department" AS dprt ON dprt."Department_Id" = emp."DepartmentId"',
+    'ORDER BY emp."Employee_Id"'
+])
+
+
+def _lemmatize_name(value: str | None) -> str:
+    # Тот же кэш лемм, что у быстрого пути: леммы из индекса и из сообщения совпадают по построению.
+    return " ".join(map(lemmatize_word, normalize_text(value or "").split()))
+
+
+def _ngrams(value: str) -> set[str]:
+    return {value[i:i + NGRAM_SIZE] for i in range(len(value) - NGRAM_SIZE + 1)}
+
+
+def _ngram_index(values) -> dict[str, set[str]]:
+    """n-грамма -> значения, в которые она входит."""
+    index = {}
+    for value in values:
+        for ngram in _ngrams(value):
+            index.setdefault(ngram, set()).add(value)
+    return index
+
+
+def _collation_key(value: str | None) -> tuple:
+    # Приближение к сортировке Postgres: без учёта регистра, "ё" рядом с "е", NULL в конце.
+    if value is None:
+        return 1, ""
+    return 0, value.casefold().replace("ё", "е")
+
+
+class EmployeeRecord:
+    __slots__ = (
+        "employee_id", "surname", "name", "father", "birthday", "first_day", "language_name",
+        "rank_status", "project_name", "department_name", "contacts",
+        "name_lower", "surname_lower", "name_lemma", "surname_lemma", "birthday_month_day", "birthday_sort_key",
+    )
+
+    def __init__(self, row):
+        (self.employee_id, self.surname, self.name, self.father, self.birthday, self.first_day,
+         self.language_name, self.rank_status, self.project_name, self.department_name, self.contacts) = row
+        self.name_lower = (self.name or "").lower()
+        self.surname_lower = (self.surname or "").lower()
+        self.name_lemma = _lemmatize_name(self.name)
+        self.surname_lemma = _lemmatize_name(self.surname)
+        self.birthday_month_day = self.birthday.month * 100 + self.birthday.day if self.birthday else None
+        self.birthday_sort_key = (
+            self.birthday_month_day or 1300,
+            _collation_key(self.surname),
+            _collation_key(self.name),
+        )
+
+    def age_on(self, date: datetime.date) -> int | None:
+        if not self.birthday:
+            return None
+        return date.year - self.birthday.year - ((date.month, date.day) < (self.birthday.month, self.birthday.day))
+
+    def as_person_record(self) -> PersonRecord:
+        return PersonRecord(self.surname, self.name, self.father, self.birthday, self.first_day,
+                            self.language_name, self.rank_status, self.project_name, self.department_name,
+                            self.contacts)
+
+    def as_birthday_record(self) -> BirthdayRecord:
+        return BirthdayRecord(self.surname, self.name, self.father, self.birthday, self.department_name)
+
+
+class EmployeeDirectory:
+    """
+    Снимок справочника сотрудников в памяти процесса. Отвечает на search_person и find_birthday
+    без обращения к базе данных, пока снимок не старше max_staleness секунд; иначе answer()
+    возвращает None, и запрос выполняется через SQL как обычно.
+    Снимок перечитывается каждые refresh_interval секунд и сразу после NOTIFY
+    об изменении таблиц справочника (см. migrations/002_data_changed_notify.sql).
+    """
+
+    def __init__(self, refresh_interval: float = 600.0, max_staleness: float = 1800.0):
+        self.refresh_interval = refresh_interval
+        self.max_staleness = max_staleness
+        self.loaded_at = None
+        # Номер снимка: растёт при каждой загрузке.
+        self.generation = 0
+        self._records = ()
+        self._by_name = {}
+        self._by_surname = {}
+        self._by_lemma = {}
+        self._name_ngrams = {}
+        self._surname_ngrams = {}
+        self._positions = {}
+        self._changed = asyncio.Event()
+
+    def load(self, rows):
+        """Строит новый снимок и индексы из строк SNAPSHOT_QUERY и атомарно подменяет текущий."""
+        records = tuple(EmployeeRecord(row) for row in rows)
+        by_name, by_surname, by_lemma = {}, {}, {}
+        for record in records:
+            by_name.setdefault(record.name_lower, []).append(record)
+            by_surname.setdefault(record.surname_lower, []).append(record)
+            for lemma in {record.name_lemma, record.surname_lemma}:
+                by_lemma.setdefault(lemma, []).append(record)
+        name_ngrams, surname_ngrams = _ngram_index(by_name), _ngram_index(by_surname)
+        positions = {id(record): position for position, record in enumerate(records)}
+        (self._records, self._by_name, self._by_surname, self._by_lemma, self._name_ngrams, self._surname_ngrams,
+         self._positions) = records, by_name, by_surname, by_lemma, name_ngrams, surname_ngrams, positions
+        self.loaded_at = time.monotonic()
+        self.generation += 1
+
+    async def refresh(self, db) -> bool:
+        rows = await db.execute_query(SNAPSHOT_QUERY, fetch=True)
+        if rows is None:
+            logger.warning("Не удалось обновить снимок справочника сотрудников.")
+            return False
+        await asyncio.to_thread(self.load, rows)
+        logger.info(f"Снимок справочника сотрудников обновлён: {len(self._records)} записей.")
+        return True
+
+    async def run(self, db):
+        """Фоновое обновление снимка: по таймеру и по NOTIFY об изменении таблиц справочника."""
+        await db.listen(DATA_CHANGED_CHANNEL, self._on_data_changed)
+        while True:
+            await self.refresh(db)
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=self.refresh_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._changed.clear()
+
+    def _on_data_changed(self, table_name: str):
+        if table_name in DIRECTORY_TABLES:
+            self._changed.set()
+
+    def is_known_name(self, lemma: str) -> bool:
+        """Есть ли в снимке сотрудник с такой леммой имени или фамилии."""
+        return lemma in self._by_lemma
+
+    @property
+    def is_fresh(self) -> bool:
+        return self.loaded_at is not None and time.monotonic() - self.loaded_at <= self.max_staleness
+
+    def answer(self, data: dict) -> list[PersonRecord | BirthdayRecord] | None:
+        """Записи (см. rows.py) для search_person/find_birthday или None, если нужен SQL."""
+        if not self.is_fresh or DbQueryParser.name_search_mode != "ilike":
+            return None
+        intent_name = (data.get("intent") or {}).get("name")
+        entities = DbQueryParser._entities_to_dict(data.get("entities", []))
+        if intent_name == "search_person":
+            return self._search_person(entities)
+        if intent_name == "find_birthday":
+            return self._find_birthday(entities)
+        return None
+
+    @staticmethod
+    def _match_values(index: dict, ngram_index: dict, part: str) -> set[int]:
+        """id записей, у которых значение из index содержит part (как ILIKE '%part%')."""
+        if len(part) < NGRAM_SIZE:
+            # Короткую подстроку n-граммы не сужают: просматриваем все значения.
+            values = [value for value in index if part in value]
+        else:
+            candidates = sorted((ngram_index.get(ngram, ()) for ngram in _ngrams(part)), key=len)
+            values = [value for value in set(candidates[0]).intersection(*candidates[1:]) if part in value]
+        return {id(record) for value in values for record in index[value]}
+
+    def _match_names(self, part: str) -> set[int]:
+        return self._match_values(self._by_name, self._name_ngrams, part)
+
+    def _match_surnames(self, part: str) -> set[int]:
+        return self._match_values(self._by_surname, self._surname_ngrams, part)
+
+    def _match_part(self, part: str) -> set[int]:
+        """id записей, у которых имя или фамилия содержит part (как ILIKE '%part%')."""
+        return self._match_names(part) | self._match_surnames(part)
+
+    def _match_name(self, name_val: str) -> list[EmployeeRecord] | None:
+        part1, part2 = DbQueryParser._split_name_surname(name_val)
+        if not part1:
+            return None
+        part2 = part2 or part1
+        if part1 == part2:
+            matched = self._match_part(part1)
+        else:
+            matched = ((self._match_names(part1) & self._match_surnames(part2))
+                       | (self._match_names(part2) & self._match_surnames(part1)))
+        # Точные совпадения по лемме ставим первыми: в SQL порядок при LIMIT 1 не определён.
+        exact = list({id(record): record for part in {part1, part2} for record in self._by_lemma.get(part, ())
+                      if id(record) in matched}.values())
+        rest = sorted(self._positions[record_id] for record_id in matched.difference(map(id, exact)))
+        return exact + [self._records[position] for position in rest]
+
+    def _search_person(self, entities: dict) -> list[PersonRecord] | None:
+        name_val = entities.get('name', [None])[0]
+        if not name_val:
+            return None
+        matched = self._match_name(name_val)
+        if matched is None:
+            return None
+        return [matched[0].as_person_record()] if matched else []
+
+    def _find_birthday(self, entities: dict) -> list[BirthdayRecord] | None:
+        records = self._records
+        birthday_specifiers = entities.get('birthday_specifier', entities.get('date', []))
+        if birthday_specifiers:
+            month_day_ranges = parse_month_day_range(birthday_specifiers[0])
+            if month_day_ranges:
+                records = [r for r in records if r.birthday_month_day is not None
+                           and any(start <= r.birthday_month_day <= end for start, end in month_day_ranges)]
+        if 'department' in entities:
+            department = entities['department'][0].lower()
+            records = [r for r in records if r.department_name and department in r.department_name.lower()]
+        if 'name' in entities:
+            matched = self._match_name(entities['name'][0])
+            if matched is not None:
+                matched_ids = {id(record) for record in matched}
+                records = [r for r in records if id(r) in matched_ids]
+        today = datetime.date.today()
+        for entity_type, older in (('age_older_than', True), ('age_younger_than', False)):
+            if entity_type in entities:
+                try:
+                    age = int(entities[entity_type][0])
+                except ValueError:
+                    continue
+                records = [r for r in records if r.age_on(today) is not None
+                           and (r.age_on(today) > age if older else r.age_on(today) < age)]
+        return [record.as_birthday_record() for record in sorted(records, key=lambda r: r.birthday_sort_key)[:10]]
@@ -0,0 +1,141 @@
+"""
+Быстрый локальный разбор простых сообщений без обращения к Rasa: приветствия и ответы да/нет,
+примеры из /help и шаблоны вида "Найди <Фамилия> <Имя>", "Какие мероприятия <дата>?".
+
+Ответ строится в формате Rasa (intent, entities с позициями в тексте), поэтому дальше он проходит
+тот же путь, что и ответ NLU. Если правило сработало неуверенно (например, фамилии нет в справочнике
+или дату не удалось разобрать), classify возвращает None и сообщение уходит в Rasa.
+"""
+import re
+
+from .date_expressions import parse_date_range, parse_month_day_range
+from .metrics import metrics
+from .text_normalizer import lemmatize_word, normalize_text
+
+SOURCE_COUNTER = "interesch_nlu_requests_total"
+
+EXACT_CONFIDENCE = 0.99
+RULE_CONFIDENCE = 0.95
+LOW_CONFIDENCE = 0.5
+
+# Нормализованная фраза целиком -> интент без сущностей.
+SMALL_TALK = {
+    "greet": ("привет", "приветствую", "здравствуй", "здравствуйте", "добрый день", "доброе утро",
+              "добрый вечер", "хай", "салют"),
+    "goodbye": ("пока", "до свидания", "до встречи", "всего доброго", "всего хорошего"),
+    "affirm": ("да", "ага", "угу", "верно", "конечно", "точно", "ок", "хорошо", "да конечно"),
+    "deny": ("нет", "неа", "не надо", "не нужно", "нет спасибо"),
+}
+SMALL_TALK_INTENTS = {phrase: intent for intent, phrases in SMALL_TALK.items() for phrase in phrases}
+
+# Примеры из /help: нормализованный текст -> (интент, [(сущность, значение)]).
+# Значения проверяются так же, как в RULES (см. ENTITY_CHECKS).
+HELP_EXAMPLES = {
+    "найди волкова андрея": ("search_person", [("name", "Волкова Андрея")]),
+    "какие мероприятия на этой неделе": ("search_event", [("date", "на этой неделе")]),
+    "у кого день рождения в июне": ("find_birthday", [("birthday_specifier", "в июне")]),
+    "задачи алексея": ("check_task", [("name", "Алексея")]),
+}
+
+_TAIL = r"\s*[?!.]*\s*$"
+_NAME = r"(?P<value>[а-яё]+(?:-[а-яё]+)?(?:\s+[а-яё]+(?:-[а-яё]+)?)?)"
+
+# Сущность -> проверка её значения (см. FastPathClassifier._value_confidence).
+ENTITY_CHECKS = {"name": "name", "date": "date", "birthday_specifier": "birthday"}
+
+# (интент, сущность, шаблон, проверка значения); группа value — значение сущности.
+RULES = [
+    ("search_person", "name", re.compile(r"^\s*(?:найди|найти|покажи|кто\s+так(?:ой|ая))\s+" + _NAME + _TAIL,
+                                         re.IGNORECASE), "name"),
+    ("check_task", "name", re.compile(r"^\s*задачи\s+" + _NAME + _TAIL, re.IGNORECASE), "name"),
+    ("search_event", "date", re.compile(r"^\s*(?:какие\s+)?(?:мероприятия|события)\s+(?P<value>.+?)" + _TAIL,
+                                        re.IGNORECASE), "date"),
+    ("find_birthday", "birthday_specifier", re.compile(
+        r"^\s*у\s+кого\s+(?:день|дни)\s+рождения\s+(?P<value>.+?)" + _TAIL, re.IGNORECASE), "birthday"),
+]
+
+
+def _response(text: str, intent: str, confidence: float, entities: list[dict]) -> dict:
+    return {
+        "text": text,
+        "intent": {"name": intent, "confidence": confidence},
+        "entities": entities,
+        "intent_ranking": [{"name": intent, "confidence": confidence}],
+        "response_selector": {},
+    }
+
+
+def _entity(entity: str, value: str, start: int, confidence: float) -> dict:
+    return {"entity": entity, "value": value, "start": start, "end": start + len(value),
+            "confidence_entity": confidence, "extractor": "fast_path"}
+
+
+class FastPathClassifier:
+    """
+    Правила перед обращением к Rasa. Имена в шаблонах проверяются по индексу лемм
+    имён и фамилий из снимка EmployeeDirectory; пока снимок не загружен, такие шаблоны не срабатывают.
+    Счётчики handled/fallback отдаются в /metrics как interesch_nlu_requests_total{source=...}.
+    """
+
+    def __init__(self, directory=None, min_confidence: float = 0.9):
+        self.directory = directory
+        self.min_confidence = min_confidence
+        self.handled = 0
+        self.fallback = 0
+
+    def classify(self, text: str) -> dict | None:
+        response = self._classify(text)
+        if response is not None and response["intent"]["confidence"] >= self.min_confidence:
+            self.handled += 1
+            metrics.increment(SOURCE_COUNTER, source="fast_path")
+            return response
+        self.fallback += 1
+        metrics.increment(SOURCE_COUNTER, source="rasa")
+        return None
+
+    @property
+    def handled_fraction(self) -> float:
+        total = self.handled + self.fallback
+        return self.handled / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {"handled": self.handled, "fallback": self.fallback, "handled_fraction": self.handled_fraction}
+
+    def _classify(self, text: str) -> dict | None:
+        normalized = normalize_text(text)
+        intent = SMALL_TALK_INTENTS.get(normalized)
+        if intent is not None:
+            return _response(text, intent, EXACT_CONFIDENCE, [])
+
+        example = HELP_EXAMPLES.get(normalized)
+        if example is not None:
+            intent, values = example
+            text_lower = text.lower()
+            entities = [_entity(entity, text[start:start + len(value)], start, EXACT_CONFIDENCE)
+                        for entity, value in values
+                        if (start := text_lower.find(value.lower())) != -1]
+            if len(entities) == len(values) and all(
+                    self._value_confidence(ENTITY_CHECKS[entity["entity"]], entity["value"]) >= self.min_confidence
+                    for entity in entities):
+                return _response(text, intent, EXACT_CONFIDENCE, entities)
+
+        for intent, entity, pattern, check in RULES:
+            match = pattern.match(text)
+            if match is None:
+                continue
+            value = match.group("value")
+            confidence = self._value_confidence(check, value)
+            return _response(text, intent, confidence, [_entity(entity, value, match.start("value"), confidence)])
+        return None
+
+    def _value_confidence(self, check: str, value: str) -> float:
+        if check == "name":
+            return RULE_CONFIDENCE if self._known_name(value) else LOW_CONFIDENCE
+        if check == "date":
+            return RULE_CONFIDENCE if parse_date_range(value) else LOW_CONFIDENCE
+        return RULE_CONFIDENCE if parse_month_day_range(value) else LOW_CONFIDENCE
+
+    def _known_name(self, value: str) -> bool:
+        if self.directory is None:
+            return False
+        return all(self.directory.is_known_name(lemmatize_word(word)) for word in normalize_text(value).split())
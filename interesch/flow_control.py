@@ -0,0 +1,61 @@
+"""
+Ограничение частоты запросов пользователей и объединение одинаковых запросов, выполняющихся одновременно.
+"""
+import asyncio
+import time
+
+from .cache import LruTtlCache
+
+
+class RateLimiter:
+    """
+    Token bucket на каждый ключ (Telegram ID): burst запросов подряд, дальше — rate запросов в секунду.
+    Корзина, простоявшая burst / rate секунд, снова полна, поэтому её запись просто истекает из кэша.
+    """
+
+    def __init__(self, rate: float, burst: int, maxsize: int = 65536):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate и burst должны быть положительными")
+        self.rate = rate
+        self.burst = burst
+        self._buckets = LruTtlCache(maxsize=maxsize, ttl=burst / rate)
+
+    def allow(self, key) -> bool:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = self.burst
+        else:
+            tokens, updated_at = bucket
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets.set(key, (tokens, now))
+        return allowed
+
+
+class SingleFlight:
+    """
+    Объединяет одновременные вызовы с одинаковым ключом: выполняется только первый,
+    остальные ждут его результата (или исключения). Отмена одного из ожидающих
+    не отменяет общий вызов.
+    """
+
+    def __init__(self):
+        self._in_flight = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key, func):
+        task = self._in_flight.get(key)
+        if task is None:
+            self.calls += 1
+            task = self._in_flight[key] = asyncio.ensure_future(func())
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
@@ -0,0 +1,171 @@
+"""
+Отрисовка ответов бота по заранее подготовленным шаблонам.
+Результат совпадает байт в байт с прежними DbResponseParser.parse_*, но шаблоны
+(dedent и разметка) подготавливаются один раз при импорте, даты форматируются
+без strftime, а части сообщения собираются одним join.
+"""
+import datetime
+import re
+import textwrap
+
+from .rows import BirthdayRecord, EventRecord, PersonRecord, TaskRecord
+
+TWO_DIGITS = tuple(f"{number:02d}" for number in range(100))
+
+DESCRIPTION_WIDTH = 100
+
+ELLIPSIS = "..."
+# Тег (группы: "/" у закрывающего, имя) или HTML-сущность — их нельзя разрезать.
+HTML_TOKEN_PATTERN = re.compile(r"<(/?)([a-zA-Z][\w-]*)[^>]*>|&#?\w+;")
+
+PERSON_TEMPLATE_SOURCE = '''
+                Нашёл первое совпадение:
+
+                <b>{surname} {name} {father}</b>
+                <b>День рождения:</b> {birthday}
+                <b>Вступил в должность:</b> {first_day}
+                <b>Пишет на:</b> {language}
+                <b>Грейд:</b> {rank}
+                <b>Сейчас работает над проектом:</b> {project}
+                <b>Состоит в отделе:</b> {department}
+                {email}
+                {phone}
+            '''
+PERSON_TEMPLATE = textwrap.dedent(PERSON_TEMPLATE_SOURCE).strip()
+
+
+def format_date(value) -> str:
+    """Как strftime("%d.%m.%Y")."""
+    return f"{TWO_DIGITS[value.day]}.{TWO_DIGITS[value.month]}.{value.year}"
+
+
+def format_day_month(value) -> str:
+    """Как strftime("%d.%m")."""
+    return f"{TWO_DIGITS[value.day]}.{TWO_DIGITS[value.month]}"
+
+
+def format_time(value) -> str:
+    """Как strftime("%H:%M"); у date время 00:00."""
+    if isinstance(value, datetime.datetime):
+        return f"{TWO_DIGITS[value.hour]}:{TWO_DIGITS[value.minute]}"
+    return "00:00"
+
+
+def shorten_description(text: str) -> str:
+    """
+    Как textwrap.shorten(text, width=100, placeholder='...'). Короткое описание возвращается сразу,
+    а длинному TextWrapper получает только начало до первого пробела за пределами ширины:
+    остальные слова в строку всё равно не попадут.
+    """
+    collapsed = " ".join(text.split())
+    if len(collapsed) <= DESCRIPTION_WIDTH:
+        return collapsed
+    cut = collapsed.find(" ", DESCRIPTION_WIDTH + 1)
+    return textwrap.shorten(collapsed if cut == -1 else collapsed[:cut], width=DESCRIPTION_WIDTH, placeholder='...')
+
+
+def truncate_html(text: str, limit: int) -> str:
+    """
+    Обрезает HTML-разметку до limit символов с "..." в конце: разрез не попадает внутрь тега
+    или сущности, а теги, открытые до места разреза, закрываются.
+    """
+    if len(text) <= limit:
+        return text
+    open_tags = []
+    position = 0
+    for match in HTML_TOKEN_PATTERN.finditer(text):
+        budget = limit - len(ELLIPSIS) - sum(len(tag) + 3 for tag in open_tags)
+        if match.start() > budget:
+            return _cut_html(text, max(position, budget), open_tags)
+        is_closing, tag = match.group(1), match.group(2)
+        tags = open_tags
+        if tag and is_closing:
+            if tag in open_tags:
+                tags = open_tags[:len(open_tags) - 1 - open_tags[::-1].index(tag)]
+        elif tag:
+            tags = [*open_tags, tag]
+        if match.end() + len(ELLIPSIS) + sum(len(tag) + 3 for tag in tags) > limit:
+            return _cut_html(text, match.start(), open_tags)
+        open_tags, position = tags, match.end()
+    budget = limit - len(ELLIPSIS) - sum(len(tag) + 3 for tag in open_tags)
+    return _cut_html(text, max(position, budget), open_tags)
+
+
+def _cut_html(text: str, end: int, open_tags: list[str]) -> str:
+    return "".join((text[:end], ELLIPSIS, *(f"</{tag}>" for tag in reversed(open_tags))))
+
+
+def render_person(row: PersonRecord) -> str:
+    contacts = row.contacts or {}
+    phone = contacts.get("phone")
+    email = contacts.get("email")
+    values = {
+        "surname": row.surname or "",
+        "name": row.name or "",
+        "father": row.father or "",
+        "birthday": format_date(row.birthday) if row.birthday else "-",
+        "first_day": format_date(row.first_day) if row.first_day else "-",
+        "language": row.language_name or "-",
+        "rank": row.rank_status or "-",
+        "project": row.project_name or "-",
+        "department": row.department_name or "-",
+        "email": f"<b>Почта:</b> {email}" if email else "<b>Почта:</b> -",
+        "phone": f"<b>Номер телефона:</b> {phone}" if phone else "<b>Номер телефона:</b> -",
+    }
+    if any("\n" in str(value) for value in values.values()):
+        # перевод строки в значении меняет результат dedent — считаем так же, как прежде
+        return textwrap.dedent(PERSON_TEMPLATE_SOURCE.format_map(values)).strip()
+    return PERSON_TEMPLATE.format_map(values).strip()
+
+
+def render_birthday_entry(row: BirthdayRecord) -> str:
+    birthday_str = format_day_month(row.birthday) if isinstance(row.birthday, datetime.date) else "Дата не указана"
+    person_info = f"{row.surname or ''} {row.name or ''} {row.father or ''}".strip()
+    return f"- {person_info} ({birthday_str}), Отдел: {row.department_name or 'Не указан'}"
+
+
+def render_task_entry(row: TaskRecord) -> str:
+    deadline = row.task_deadline
+    deadline_str = (f"{format_date(deadline)} {format_time(deadline)}"
+                    if isinstance(deadline, datetime.date) else "Нет даты")
+    assignee_full_name = f"{row.assignee_surname or ''} {row.assignee_name or ''}".strip()
+    return "".join((
+        "<b>", row.task_name or "Без названия", "</b> (Проект: ", row.project_name or "Без проекта", ")",
+        "\n  <i>Описание:</i> ", row.task_description or "Нет описания",
+        "\n  Исполнитель: ", assignee_full_name or "-",
+        "\n  Дата/Дедлайн: ", deadline_str, ", Статус: -, Приоритет: -",
+    ))
+
+
+def _duration(begin, end) -> str:
+    total_seconds = (end - begin).total_seconds()
+    hours, remainder = divmod(total_seconds, 3600)
+    minutes, _ = divmod(remainder, 60)
+    if hours > 0 and minutes > 0:
+        return f"{int(hours)} ч {int(minutes)} мин"
+    if hours > 0:
+        return f"{int(hours)} ч"
+    if minutes > 0:
+        return f"{int(minutes)} мин"
+    if total_seconds > 0:
+        return f"{int(total_seconds)} сек"
+    return ""
+
+
+def render_event_entry(row: EventRecord) -> str:
+    begin, end = row.event_begin, row.event_end
+    description = row.event_description or "Нет описания"
+    organizer_full_name = f"{row.organizer_surname or ''} {row.organizer_name or ''}".strip() or "Не указан"
+    begin_str = f"{format_date(begin)} в {format_time(begin)}" if begin else "Время начала не указано"
+    duration_str = _duration(begin, end) if begin and end and end > begin else ""
+
+    parts = ["<b>", row.event_name or "Без названия", "</b> (Категория: ", row.category_name or "Не указана", ")",
+             "\n  <i>Начало:</i> ", begin_str]
+    if end and not duration_str:
+        parts += ["\n  <i>Окончание:</i> ", format_date(end), " в ", format_time(end)]
+    elif duration_str:
+        parts += [", <i>Длительность:</i> ", duration_str]
+    parts += ["\n  <i>Организатор:</i> ", organizer_full_name]
+    if description != "Нет описания":
+        parts += ["\n  <i>Описание:</i> ", shorten_description(description)]
+    return "".join(parts)
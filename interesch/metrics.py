@@ -0,0 +1,198 @@
+"""
+Замеры этапов обработки сообщения (NLU, лемматизация, построение SQL, запрос к БД, отрисовка)
+в виде гистограмм по интентам и их отдача по HTTP в текстовом формате Prometheus.
+
+Этапы размечаются через stage(); время этапов одного сообщения копится в track_request()
+и записывается в гистограммы с интентом сообщения, когда он уже известен.
+"""
+import asyncio
+import bisect
+import contextlib
+import contextvars
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм, с.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+TOTAL_STAGE = "total"
+NO_INTENT = "none"
+
+
+class _Series:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class StageMetrics:
+    """Гистограммы длительности этапов с метками stage и intent и простые счётчики."""
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS, name: str = "interesch_stage_seconds"):
+        self.buckets = buckets
+        self.name = name
+        self._series = {}
+        self._counters = {}
+
+    def increment(self, counter_name: str, value: float = 1, **labels):
+        key = (counter_name, tuple(sorted(labels.items())))
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, stage_name: str, intent: str | None, seconds: float):
+        key = (stage_name, intent or NO_INTENT)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _Series(len(self.buckets))
+        index = bisect.bisect_left(self.buckets, seconds)
+        if index < len(self.buckets):
+            series.counts[index] += 1
+        series.sum += seconds
+        series.count += 1
+
+    def render(self) -> str:
+        """Все гистограммы в текстовом формате Prometheus."""
+        lines = [f"# HELP {self.name} Длительность этапов обработки сообщения.",
+                 f"# TYPE {self.name} histogram"]
+        for (stage_name, intent), series in sorted(self._series.items()):
+            labels = f'stage="{stage_name}",intent="{intent}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, series.counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {series.count}')
+            lines.append(f"{self.name}_sum{{{labels}}} {series.sum}")
+            lines.append(f"{self.name}_count{{{labels}}} {series.count}")
+        typed = set()
+        for (counter_name, labels), value in sorted(self._counters.items()):
+            if counter_name not in typed:
+                typed.add(counter_name)
+                lines.append(f"# TYPE {counter_name} counter")
+            label_text = ",".join(f'{label}="{label_value}"' for label, label_value in labels)
+            lines.append(f"{counter_name}{{{label_text}}} {value}" if label_text else f"{counter_name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def _merged(self, stage_name: str, intent: str | None) -> tuple[list[int], int, float]:
+        counts, total, seconds = [0] * len(self.buckets), 0, 0.0
+        for (series_stage, series_intent), series in self._series.items():
+            if series_stage == stage_name and (intent is None or series_intent == intent):
+                counts = [a + b for a, b in zip(counts, series.counts)]
+                total += series.count
+                seconds += series.sum
+        return counts, total, seconds
+
+    def intents(self, stage_name: str) -> list[str]:
+        return sorted(intent for series_stage, intent in self._series if series_stage == stage_name)
+
+    def totals(self, stage_name: str, intent: str | None = None) -> tuple[int, float]:
+        """Число замеров этапа и их суммарное время, с; intent=None — по всем интентам."""
+        _, total, seconds = self._merged(stage_name, intent)
+        return total, seconds
+
+    def quantile(self, q: float, stage_name: str, intent: str | None = None) -> float | None:
+        """
+        Оценка квантиля q длительности этапа по гистограмме, как histogram_quantile в Prometheus
+        (линейно внутри корзины); intent=None — по всем интентам. None, если замеров нет.
+        """
+        counts, total, _ = self._merged(stage_name, intent)
+        if not total:
+            return None
+        rank = q * total
+        cumulative, lower = 0, 0.0
+        for bound, count in zip(self.buckets, counts):
+            if count and cumulative + count >= rank:
+                return lower + (bound - lower) * (rank - cumulative) / count
+            cumulative += count
+            lower = bound
+        return self.buckets[-1]
+
+    def clear(self, buckets: tuple | None = None):
+        """Сбрасывает замеры; buckets — новые границы корзин (например, более частые для бенчмарка)."""
+        self._series.clear()
+        self._counters.clear()
+        if buckets is not None:
+            self.buckets = buckets
+
+
+class RequestTimings:
+    """Время этапов одного сообщения; intent задаёт обработчик после ответа NLU."""
+    __slots__ = ("intent", "stages", "active")
+
+    def __init__(self):
+        self.intent = None
+        self.stages = {}
+        self.active = set()
+
+
+metrics = StageMetrics()
+
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+@contextlib.contextmanager
+def stage(name: str):
+    """
+    Замеряет этап name. Работает и как декоратор синхронной функции; асинхронный код оборачивается через with.
+    Вложенный этап с тем же именем внутри сообщения не считается повторно.
+    """
+    timings = _request_timings.get()
+    if timings is not None:
+        if name in timings.active:
+            yield
+            return
+        timings.active.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        if timings is None:
+            metrics.observe(name, None, elapsed)
+        else:
+            timings.active.discard(name)
+            timings.stages[name] = timings.stages.get(name, 0.0) + elapsed
+
+
+@contextlib.contextmanager
+def track_request():
+    """Собирает этапы обработки одного сообщения и по завершении записывает их вместе с общим временем."""
+    timings = RequestTimings()
+    token = _request_timings.set(timings)
+    started = time.perf_counter()
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+        metrics.observe(TOTAL_STAGE, timings.intent, time.perf_counter() - started)
+        for name, seconds in timings.stages.items():
+            metrics.observe(name, timings.intent, seconds)
+
+
+async def _handle_http(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request_line = await reader.readline()
+        while (await reader.readline()).strip():
+            pass
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status, body = "200 OK", metrics.render().encode("utf-8")
+        else:
+            status, body = "404 Not Found", b"not found\n"
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_metrics(host: str = "127.0.0.1", port: int = 9108) -> asyncio.Server:
+    """Запускает HTTP-сервер с GET /metrics в текущем цикле событий."""
+    server = await asyncio.start_server(_handle_http, host, port)
+    logger.info(f"Метрики доступны на http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,5 @@
+"""
+Канал NOTIFY об изменении таблиц (migrations/002, 007, 008): полезная нагрузка — имя таблицы.
+На него подписываются снимок справочника, список авторизованных пользователей и кэши ответов и результатов.
+"""
+DATA_CHANGED_CHANNEL = "interesch_data_changed"
@@ -0,0 +1,55 @@
+"""
+Запросы к Bot API без сети — для локальной проверки бота (например, webhook-режима
+с записанными обновлениями): исходящие сообщения пишутся в лог, а методы отвечают
+правдоподобными заглушками.
+"""
+import json
+import logging
+import time
+
+from telegram.request import BaseRequest
+
+logger = logging.getLogger(__name__)
+
+OFFLINE_BOT_USER = {"id": 1, "is_bot": True, "first_name": "Интересыч", "username": "interesch_offline_bot"}
+
+
+class OfflineRequest(BaseRequest):
+    def __init__(self):
+        self._message_ids = 0
+
+    @property
+    def read_timeout(self) -> float | None:
+        return None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def _message(self, parameters: dict) -> dict:
+        self._message_ids += 1
+        return {
+            "message_id": self._message_ids,
+            "date": int(time.time()),
+            "chat": {"id": int(parameters.get("chat_id", 0)), "type": "private"},
+            "from": OFFLINE_BOT_USER,
+            "text": parameters.get("text", ""),
+        }
+
+    async def do_request(self, url: str, method: str, request_data=None, read_timeout=None, write_timeout=None,
+                         connect_timeout=None, pool_timeout=None) -> tuple[int, bytes]:
+        api_method = url.rsplit("/", 1)[-1]
+        parameters = request_data.parameters if request_data is not None else {}
+        if api_method == "getMe":
+            result = OFFLINE_BOT_USER
+        elif api_method == "sendMessage":
+            logger.info(f"[offline] sendMessage в чат {parameters.get('chat_id')}:\n{parameters.get('text')}")
+            result = self._message(parameters)
+        elif api_method == "getUpdates":
+            result = []
+        else:
+            logger.info(f"[offline] {api_method}: {parameters}")
+            result = True
+        return 200, json.dumps({"ok": True, "result": result}).encode("utf-8")
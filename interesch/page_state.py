@@ -0,0 +1,68 @@
+"""
+Хранилища состояния кнопок "следующая страница": токен из callback_data -> (payload, ключ последней строки).
+LocalPageStates держит состояние в памяти процесса; PostgresPageStates — в таблице "PageState"
+(migrations/006), чтобы нажатие кнопки обработала любая из реплик бота за балансировщиком.
+"""
+import datetime
+import json
+import random
+
+from .cache import LruTtlCache
+
+
+def _encode_key_value(value):
+    if isinstance(value, datetime.datetime):
+        return {"datetime": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"date": value.isoformat()}
+    return value
+
+
+def _decode_key_value(value):
+    if isinstance(value, dict):
+        if "datetime" in value:
+            return datetime.datetime.fromisoformat(value["datetime"])
+        if "date" in value:
+            return datetime.date.fromisoformat(value["date"])
+    return value
+
+
+class LocalPageStates:
+    def __init__(self, maxsize: int = 4096, ttl: float = 3600):
+        self.cache = LruTtlCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, token: str):
+        return self.cache.get(token)
+
+    async def set(self, token: str, state: tuple):
+        self.cache.set(token, state)
+
+
+class PostgresPageStates:
+    """Состояние страниц в общей базе; просроченные записи удаляются при записи примерно раз в purge_every вызовов."""
+
+    def __init__(self, db, ttl: float = 3600, purge_every: int = 100):
+        self.db = db
+        self.ttl = ttl
+        self.purge_every = purge_every
+
+    async def get(self, token: str):
+        rows = await self.db.execute_query(
+            'SELECT "State" FROM "PageState" WHERE "Token" = %s AND "ExpiresAt" > now()', (token,), fetch=True
+        )
+        if not rows:
+            return None
+        state = rows[0][0]
+        return state["payload"], tuple(_decode_key_value(value) for value in state["after"])
+
+    async def set(self, token: str, state: tuple):
+        payload, after = state
+        document = json.dumps({"payload": payload, "after": [_encode_key_value(value) for value in after]},
+                              ensure_ascii=False)
+        await self.db.execute_query(
+            'INSERT INTO "PageState" ("Token", "State", "ExpiresAt") '
+            'VALUES (%s, %s, now() + make_interval(secs => %s))',
+            (token, document, self.ttl)
+        )
+        if random.random() < 1 / self.purge_every:
+            await self.db.execute_query('DELETE FROM "PageState" WHERE "ExpiresAt" <= now()')
@@ -0,0 +1,163 @@
+"""
+Кэш результатов чтения на уровне Database/AsyncDatabase (включается параметром result_cache).
+
+Ключ — отпечаток текста запроса (для QueryPlan — его имя), параметры и версии таблиц, которые
+упоминает запрос. Запись таблицы (через тот же объект Database или NOTIFY, см. subscribe) увеличивает
+её версию и сразу удаляет зависящие от неё записи. Объём ограничен суммарным размером результатов
+(по длине pickle), лишнее вытесняется по LRU.
+"""
+import hashlib
+import pickle
+import re
+import time
+from collections import OrderedDict
+
+from psycopg2 import sql
+
+from .cache import CacheStats, freeze_key
+from .notifications import DATA_CHANGED_CHANNEL
+
+READ_PATTERN = re.compile(r"^\s*select\b", re.IGNORECASE)
+LOCKING_PATTERN = re.compile(r"\bfor\s+(?:update|share|no\s+key\s+update|key\s+share)\b", re.IGNORECASE)
+# Псевдоним столбца вида emp."Birthday" (например, в EXTRACT(... FROM emp."Birthday")) таблицей не считается.
+READ_TABLES_PATTERN = re.compile(r'\b(?:from|join)\s+(?:"([^"]+)"|([a-z_][\w$]*)\b)(?!\s*\.)', re.IGNORECASE)
+WRITE_TABLES_PATTERN = re.compile(
+    r'\b(?:insert\s+into|update|delete\s+from|truncate(?:\s+table)?)\s+(?:only\s+)?(?:"([^"]+)"|([a-z_][\w$]*))',
+    re.IGNORECASE
+)
+
+
+def statement_text(query) -> str | None:
+    """Текст запроса без подстановки параметров или None, если его нельзя получить без соединения."""
+    if isinstance(query, str):
+        return query
+    if isinstance(query, sql.SQL):
+        return query.string
+    return None
+
+
+def fingerprint(text: str) -> str:
+    return hashlib.sha1(" ".join(text.split()).encode("utf-8")).hexdigest()[:16]
+
+
+def _tables(pattern: re.Pattern, text: str) -> frozenset:
+    return frozenset(quoted or plain for quoted, plain in pattern.findall(text))
+
+
+def written_tables(query) -> frozenset:
+    text = statement_text(query)
+    return _tables(WRITE_TABLES_PATTERN, text) if text else frozenset()
+
+
+class QueryResultCache:
+    """
+    LRU-кэш результатов SELECT с временем жизни и ограничением по байтам.
+    Не потокобезопасен: AsyncDatabase обращается к нему только из цикла событий.
+    """
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, ttl: float = 60):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self.size = 0
+        self.versions = {}
+        self._data = OrderedDict()
+        self._by_table = {}
+        self._shapes = {}
+
+    def _shape(self, query) -> tuple[str, frozenset] | None:
+        text = statement_text(query)
+        if text is None:
+            return None
+        shape = self._shapes.get(text)
+        if shape is None:
+            if not READ_PATTERN.match(text) or LOCKING_PATTERN.search(text):
+                shape = (None, frozenset())
+            else:
+                name = getattr(query, "name", None) or fingerprint(text)
+                shape = (name, _tables(READ_TABLES_PATTERN, text))
+            if len(self._shapes) < 4096:
+                self._shapes[text] = shape
+        return shape if shape[0] is not None else None
+
+    def key(self, query, params=None, record_type=None) -> tuple | None:
+        """Ключ с текущими версиями таблиц или None, если запрос не кэшируется (не SELECT, FOR UPDATE и т.п.)."""
+        shape = self._shape(query)
+        if shape is None:
+            return None
+        name, tables = shape
+        try:
+            frozen_params = freeze_key(params)
+            hash(frozen_params)
+        except TypeError:
+            return None
+        versions = tuple(sorted((table, self.versions.get(table, 0)) for table in tables))
+        return name, frozen_params, getattr(record_type, "__name__", None), versions
+
+    def get(self, key):
+        item = self._data.get(key)
+        if item is None:
+            self.stats.misses += 1
+            return None
+        expires_at, _, value = item
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.stats.hits += 1
+        return list(value)
+
+    def set(self, key, value):
+        if any(version != self.versions.get(table, 0) for table, version in key[3]):
+            # Пока шёл запрос, таблица изменилась: результат мог устареть.
+            return
+        try:
+            size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return
+        if size > self.max_bytes:
+            return
+        self._remove(key)
+        self._data[key] = (time.monotonic() + self.ttl, size, list(value))
+        self.size += size
+        for table, _ in key[3]:
+            self._by_table.setdefault(table, set()).add(key)
+        while self.size > self.max_bytes:
+            self._remove(next(iter(self._data)))
+            self.stats.evictions += 1
+
+    def _remove(self, key):
+        item = self._data.pop(key, None)
+        if item is None:
+            return
+        self.size -= item[1]
+        for table, _ in key[3]:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    def invalidate(self, table_name: str):
+        """Хук изменения таблицы: новая версия таблицы и удаление всех записей, которые её читали."""
+        self.versions[table_name] = self.versions.get(table_name, 0) + 1
+        for key in list(self._by_table.get(table_name, ())):
+            self._remove(key)
+
+    def invalidate_written(self, query):
+        for table in written_tables(query):
+            self.invalidate(table)
+
+    async def subscribe(self, db):
+        """Подписывается на уведомления об изменении таблиц (migrations/002, 007, 008)."""
+        await db.listen(DATA_CHANGED_CHANNEL, self.invalidate)
+
+    def clear(self):
+        self._data.clear()
+        self._by_table.clear()
+        self.size = 0
+
+    def __len__(self):
+        return len(self._data)
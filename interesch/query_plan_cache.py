@@ -0,0 +1,56 @@
+import hashlib
+import re
+from typing import Callable
+
+from psycopg2 import sql
+
+from .cache import LruTtlCache
+
+PLACEHOLDER_PATTERN = re.compile(r"%(%|s)")
+
+
+class QueryPlan(sql.SQL):
+    """
+    Готовый текст запроса одной формы (интент + набор активных фильтров).
+    Выполняется как обычный sql.SQL, а AsyncDatabase может выполнять его
+    как серверный prepared statement под именем name.
+    """
+
+    def __init__(self, text: str, intent: str):
+        super().__init__(text)
+        self.intent = intent
+        self.name = f"interesch_{hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]}"
+        self.param_count = text.count("%s")
+
+    def prepare_statement(self) -> str:
+        """PREPARE с позиционными параметрами $1..$n вместо плейсхолдеров psycopg2."""
+        counter = iter(range(1, self.param_count + 1))
+        text = PLACEHOLDER_PATTERN.sub(lambda m: "%" if m.group(1) == "%" else f"${next(counter)}", self.string)
+        return f"PREPARE {self.name} AS {text}"
+
+    def execute_statement(self) -> str:
+        if not self.param_count:
+            return f"EXECUTE {self.name}"
+        return f"EXECUTE {self.name} ({', '.join(['%s'] * self.param_count)})"
+
+
+class QueryPlanCache:
+    """Кэш QueryPlan по ключу (интент, форма фильтров) с ограничением размера и статистикой."""
+
+    def __init__(self, maxsize: int = 256):
+        self._plans = LruTtlCache(maxsize=maxsize)
+
+    @property
+    def stats(self):
+        return self._plans.stats
+
+    def get_plan(self, intent: str, shape: tuple, build_text: Callable[[], str]) -> QueryPlan:
+        key = (intent, shape)
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = QueryPlan(build_text(), intent)
+            self._plans.set(key, plan)
+        return plan
+
+    def __len__(self):
+        return len(self._plans)
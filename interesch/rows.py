@@ -0,0 +1,86 @@
+"""
+Типизированные строки результатов запросов DbQueryParser.
+Поля записей совпадают с псевдонимами столбцов в SELECT, поэтому запись собирается
+по именам из cursor.description, а не по позициям, и список столбцов можно менять
+без правки кода отрисовки.
+"""
+import datetime
+from dataclasses import dataclass
+from operator import itemgetter
+from typing import Sequence
+
+
+@dataclass(slots=True)
+class PersonRecord:
+    surname: str | None
+    name: str | None
+    father: str | None
+    birthday: datetime.date | None
+    first_day: datetime.date | None
+    language_name: str | None
+    rank_status: str | None
+    project_name: str | None
+    department_name: str | None
+    contacts: dict | None
+
+
+@dataclass(slots=True)
+class BirthdayRecord:
+    surname: str | None
+    name: str | None
+    father: str | None
+    birthday: datetime.date | None
+    department_name: str | None
+
+
+@dataclass(slots=True)
+class TaskRecord:
+    task_name: str | None
+    task_description: str | None
+    task_deadline: datetime.datetime | None
+    assignee_name: str | None
+    assignee_surname: str | None
+    project_name: str | None
+    task_id: int
+
+
+@dataclass(slots=True)
+class EventRecord:
+    event_name: str | None
+    event_begin: datetime.datetime | None
+    event_end: datetime.datetime | None
+    category_name: str | None
+    event_description: str | None
+    organizer_name: str | None
+    organizer_surname: str | None
+    event_id: int
+
+
+RECORD_TYPES = {
+    "search_person": PersonRecord,
+    "find_birthday": BirthdayRecord,
+    "check_task": TaskRecord,
+    "search_event": EventRecord,
+}
+
+
+def record_factory(record_type: type, columns: Sequence[str]):
+    """Функция строка -> запись record_type; позиции полей вычисляются один раз по именам столбцов."""
+    try:
+        positions = [columns.index(field) for field in record_type.__slots__]
+    except ValueError:
+        raise ValueError(f"Столбцы {list(columns)} не подходят для {record_type.__name__}") from None
+    if len(positions) == 1:
+        return lambda row: record_type(row[positions[0]])
+    getter = itemgetter(*positions)
+    return lambda row: record_type(*getter(row))
+
+
+def column_names(description) -> list[str]:
+    return [column.name for column in description]
+
+
+def build_records(record_type: type, description, rows) -> list:
+    """Записи record_type из строк курсора с описанием столбцов description."""
+    make_record = record_factory(record_type, column_names(description))
+    return [make_record(row) for row in rows]
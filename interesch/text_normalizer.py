@@ -1,9 +1,83 @@
+import functools
+import gc
+import logging
 import string
-import pymorphy3
+import threading
+from typing import Iterable
 
-morph = pymorphy3.MorphAnalyzer()
+from .metrics import stage
 
+logger = logging.getLogger(__name__)
 
+_morph = None
+_morph_lock = threading.Lock()
+
+LEMMA_CACHE_SIZE = 4096
+
+PUNCTUATION_TRANSLATOR = str.maketrans('', '', string.punctuation)
+
+ENTITY_TYPES_TO_LEMMATIZE_VALUES = {
+    "department",
+    "skill",
+    "event_category",
+    "birthday_specifier",
+    "task_status",
+    "task_priority",
+    "task_tag",
+    "name"
+}
+
+
+def get_morph():
+    """
+    Возвращает общий для процесса pymorphy3.MorphAnalyzer, загружая словари при первом обращении.
+    Импорт пакета словари не загружает.
+    """
+    global _morph
+    if _morph is None:
+        with _morph_lock:
+            if _morph is None:
+                import pymorphy3
+                _morph = pymorphy3.MorphAnalyzer()
+    return _morph
+
+
+def preload_morph(freeze_gc: bool = True):
+    """
+    Загружает словари заранее — вызывается в родительском процессе до запуска воркеров (fork),
+    чтобы они разделяли уже загруженные словари по copy-on-write.
+    gc.freeze() убирает загруженные объекты из обхода сборщика мусора,
+    иначе он будет трогать их страницы в каждом воркере и копировать их.
+    """
+    get_morph()
+    if freeze_gc:
+        gc.collect()
+        gc.freeze()
+
+
+def normalize_text(text_value: str) -> str:
+    """
+    Нормализует фразу так же, как lemmatize_entity_value перед лемматизацией:
+    нижний регистр, без пунктуации, слова через один пробел.
+    """
+    if not text_value:
+        return ""
+
+    return " ".join(text_value.lower().translate(PUNCTUATION_TRANSLATOR).split())
+
+
+@functools.lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def lemmatize_word(word: str) -> str:
+    """Нормальная форма одного слова; общий кэш для значений сущностей и имён из справочника сотрудников."""
+    return get_morph().parse(word)[0].normal_form
+
+
+def lemma_cache_info():
+    """Статистика кэша лемм (hits, misses, maxsize, currsize)."""
+    return lemmatize_word.cache_info()
+
+
+@stage("lemmatize")
 def lemmatize_entity_value(text_value: str) -> str:
     """
     Лемматизирует значение сущности (фразу):
@@ -17,21 +91,45 @@ def lemmatize_entity_value(text_value: str) -> str:
     if not text_value:
         return ""
 
-    text_lower = text_value.lower()
-    translator = str.maketrans('', '', string.punctuation)
-    text_without_punctuation = text_lower.translate(translator)
-    words = text_without_punctuation.split()
+    return " ".join(map(lemmatize_word, normalize_text(text_value).split()))
+
+
+def lemmatize_many(values: Iterable[str]) -> list[str]:
+    """Лемматизирует набор значений за один вызов; повторяющиеся значения обрабатываются один раз."""
+    lemmatized = {}
+    result = []
+    for value in values:
+        if value not in lemmatized:
+            lemmatized[value] = lemmatize_entity_value(value)
+        result.append(lemmatized[value])
+    return result
+
 
-    lemmatized_words = []
-    for word in words:
-        if not word.strip():
-            continue
+def prepare_parser_payload(ai_response: dict) -> dict:
+    """
+    Готовит ответ NLU для DbQueryParser.parse: лемматизирует значения сущностей,
+    перечисленных в ENTITY_TYPES_TO_LEMMATIZE_VALUES.
+    """
+    processed_entities_for_parser = [entity_data.copy() for entity_data in ai_response.get('entities') or []]
+    entities_to_lemmatize = [
+        entity for entity in processed_entities_for_parser
+        if entity.get('entity') in ENTITY_TYPES_TO_LEMMATIZE_VALUES and entity.get('value')
+    ]
+    lemmatized_values = lemmatize_many(entity['value'] for entity in entities_to_lemmatize)
 
-        parsed_word = morph.parse(word)[0]
-        normal_form = parsed_word.normal_form
-        lemmatized_words.append(normal_form)
+    for entity, lemmatized_val in zip(entities_to_lemmatize, lemmatized_values):
+        if lemmatized_val != entity['value']:
+            logger.info(
+                f"Лемматизация значения сущности типа '{entity['entity']}': '{entity['value']}' -> '{lemmatized_val}'")
+        entity['value'] = lemmatized_val
 
-    return " ".join(lemmatized_words)
+    return {
+        "text": ai_response.get("text"),
+        "intent": ai_response.get("intent"),
+        "entities": processed_entities_for_parser,
+        "intent_ranking": ai_response.get("intent_ranking"),
+        "response_selector": ai_response.get("response_selector")
+    }
 
 
 if __name__ == '__main__':
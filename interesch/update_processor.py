@@ -0,0 +1,127 @@
+"""
+Параллельная обработка обновлений Telegram с сохранением порядка внутри чата.
+"""
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+
+from telegram.ext import BaseUpdateProcessor
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _ChatQueue:
+    __slots__ = ("lock", "pending")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pending = 0
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Обрабатывает обновления разных чатов параллельно, а обновления одного чата — строго
+    по очереди, в порядке поступления.
+
+    workers — сколько обработчиков выполняется одновременно; столько же одновременных
+    обращений к NLU и БД получает бот. max_pending — сколько обновлений принято в работу
+    (выполняются или ждут своей очереди в чате и свободного воркера); остальные ждут в
+    Application и разбираются, когда NLU и БД освободятся.
+
+    max_pending_per_chat — сколько обновлений одного чата может ждать своей очереди; лишние
+    отбрасываются до того, как займут место в max_pending, чтобы поток сообщений из одного чата
+    не задерживал остальные. Отброшенное обновление передаётся в on_dropped (например, для ответа
+    об ограничении частоты).
+    """
+
+    def __init__(self, workers: int, max_pending: int | None = None, max_pending_per_chat: int = 8,
+                 on_dropped: Callable[[object], Awaitable] | None = None):
+        super().__init__(max_pending or workers * 16)
+        if workers < 1:
+            raise ValueError("workers должен быть положительным")
+        if max_pending_per_chat < 1:
+            raise ValueError("max_pending_per_chat должен быть положительным")
+        self.workers = workers
+        self.max_pending_per_chat = max_pending_per_chat
+        self.on_dropped = on_dropped
+        self.dropped = 0
+        self._worker_slots = asyncio.Semaphore(workers)
+        self._chats = {}
+        self._saturated_since = None
+
+    @staticmethod
+    def chat_key(update: object):
+        """Ключ очереди: id чата; у обновлений без чата порядок не соблюдается."""
+        chat = getattr(update, "effective_chat", None)
+        return chat.id if chat is not None else None
+
+    @property
+    def saturated(self) -> bool:
+        return self.current_concurrent_updates >= self.max_concurrent_updates
+
+    async def process_update(self, update: object, coroutine):  # type: ignore[misc]
+        # BaseUpdateProcessor.process_update занимает место в max_pending до do_process_update,
+        # а очередь чата нужно проверить раньше — поэтому метод переопределён, несмотря на @final.
+        key = self.chat_key(update)
+        if key is None:
+            await super().process_update(update, coroutine)
+            return
+        chat = self._chats.get(key)
+        if chat is None:
+            chat = self._chats[key] = _ChatQueue()
+        if chat.pending >= self.max_pending_per_chat:
+            await self._drop(key, update, coroutine)
+            return
+        chat.pending += 1
+        try:
+            await super().process_update(update, coroutine)
+        finally:
+            chat.pending -= 1
+            if chat.pending == 0:
+                del self._chats[key]
+
+    async def do_process_update(self, update: object, coroutine):
+        chat = self._chats.get(self.chat_key(update))
+        if chat is None:
+            await self._run(coroutine)
+            return
+        async with chat.lock:
+            await self._run(coroutine)
+
+    async def _drop(self, key, update: object, coroutine):
+        if asyncio.iscoroutine(coroutine):
+            coroutine.close()
+        self.dropped += 1
+        metrics.increment("interesch_updates_dropped_total")
+        logger.debug(f"Чат {key}: в очереди уже {self.max_pending_per_chat} обновлений, новое отброшено")
+        if self.on_dropped is not None:
+            try:
+                await self.on_dropped(update)
+            except Exception as e:
+                logger.warning(f"Не удалось ответить на отброшенное обновление чата {key}: {e}")
+
+    async def _run(self, coroutine):
+        started = time.perf_counter()
+        async with self._worker_slots:
+            metrics.observe("queue", None, time.perf_counter() - started)
+            self._log_saturation()
+            await coroutine
+
+    def _log_saturation(self):
+        if self.saturated:
+            if self._saturated_since is None:
+                self._saturated_since = time.monotonic()
+                logger.warning(f"Очередь обновлений заполнена ({self.max_concurrent_updates}), "
+                               f"новые обновления ждут освобождения воркеров")
+        elif self._saturated_since is not None:
+            logger.info(f"Очередь обновлений разгружена за {time.monotonic() - self._saturated_since:.1f} с")
+            self._saturated_since = None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
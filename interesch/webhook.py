@@ -0,0 +1,81 @@
+"""
+Webhook-режим бота: обновления Telegram принимает асинхронный HTTP-сервер (aiohttp)
+и кладёт их в очередь Application вместо long polling.
+
+POST на path принимает одно обновление или JSON-массив обновлений (например, записанных
+из лога), GET /healthz — проверка живости для балансировщика. Реплик может быть несколько:
+вебхук у Telegram регистрирует одна из них (с --webhook-url), остальные только принимают обновления.
+"""
+import asyncio
+import logging
+import signal
+
+from aiohttp import web
+from telegram import Update
+
+logger = logging.getLogger(__name__)
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookServer:
+    def __init__(self, app, path: str = "/telegram", secret_token: str | None = None, max_batch: int = 100):
+        self.app = app
+        self.path = path
+        self.secret_token = secret_token
+        self.max_batch = max_batch
+        self.web_app = web.Application()
+        self.web_app.router.add_post(path, self.handle_updates)
+        self.web_app.router.add_get("/healthz", self.handle_health)
+
+    async def handle_updates(self, request: web.Request) -> web.Response:
+        if self.secret_token and request.headers.get(SECRET_TOKEN_HEADER) != self.secret_token:
+            return web.json_response({"ok": False, "error": "forbidden"}, status=403)
+        try:
+            data = await request.json()
+        except ValueError:
+            return web.json_response({"ok": False, "error": "invalid json"}, status=400)
+        items = data if isinstance(data, list) else [data]
+        if len(items) > self.max_batch:
+            return web.json_response({"ok": False, "error": f"more than {self.max_batch} updates"}, status=413)
+        try:
+            updates = [Update.de_json(item, self.app.bot) for item in items]
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Не удалось разобрать обновление: {e}")
+            return web.json_response({"ok": False, "error": "invalid update"}, status=400)
+        for update in updates:
+            await self.app.update_queue.put(update)
+        return web.json_response({"ok": True, "accepted": len(updates)})
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        return web.Response(text="ok")
+
+
+async def serve_webhook(app, host: str, port: int, path: str, webhook_url: str | None = None,
+                        secret_token: str | None = None):
+    """Запускает Application и HTTP-сервер и работает до SIGINT/SIGTERM — так же, как app.run_polling()."""
+    server = WebhookServer(app, path, secret_token)
+    await app.initialize()
+    if app.post_init:
+        await app.post_init(app)
+    if webhook_url:
+        await app.bot.set_webhook(webhook_url, secret_token=secret_token, allowed_updates=Update.ALL_TYPES)
+        logger.info(f"Вебхук зарегистрирован: {webhook_url}")
+    await app.start()
+    runner = web.AppRunner(server.web_app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Webhook-сервер слушает http://{host}:{port}{path}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signal_number, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        await runner.cleanup()
+        await app.stop()
+        await app.shutdown()
+        if app.post_shutdown:
+            await app.post_shutdown(app)
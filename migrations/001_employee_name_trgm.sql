@@ -0,0 +1,12 @@
+-- Триграммные индексы для поиска сотрудников по имени и фамилии.
+-- Обслуживают и режим NAME_SEARCH_MODE=trigram (операторы % и similarity, ILIKE 'лемма%'),
+-- и прежние условия ILIKE '%...%' (для значений от трёх символов), поэтому поиск
+-- в search_person, find_birthday, check_task и по организатору в search_event
+-- перестаёт требовать полного просмотра таблицы "Employees".
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS employees_name_trgm_idx
+    ON "Employees" USING gin ("Name" gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS employees_surname_trgm_idx
+    ON "Employees" USING gin ("Surname" gin_trgm_ops);
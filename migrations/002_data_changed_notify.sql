@@ -0,0 +1,25 @@
+-- Уведомления об изменении данных: после каждого изменяющего оператора в таблице
+-- отправляется NOTIFY в канал interesch_data_changed с именем таблицы в payload.
+-- На канал подписываются кэши бота (снимок справочника сотрудников и т. п.),
+-- чтобы обновляться сразу, не дожидаясь планового перечитывания.
+CREATE OR REPLACE FUNCTION interesch_notify_data_changed() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('interesch_data_changed', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    table_name text;
+BEGIN
+    FOREACH table_name IN ARRAY ARRAY['Employees', 'Languages', 'Rank', 'Project', 'Department'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS interesch_data_changed ON %I', table_name);
+        EXECUTE format(
+            'CREATE TRIGGER interesch_data_changed AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION interesch_notify_data_changed()',
+            table_name
+        );
+    END LOOP;
+END;
+$$;
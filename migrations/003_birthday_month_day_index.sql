@@ -0,0 +1,6 @@
+-- Индекс по дню рождения в виде MMDD (month * 100 + day) для find_birthday.
+-- Выражение должно совпадать с BIRTHDAY_MONTH_DAY_SQL в interesch/database_query_parser.py,
+-- иначе планировщик не сопоставит условия "= MMDD" / "BETWEEN" и ORDER BY с индексом.
+-- Рассчитано на столбец "Birthday" типа date: EXTRACT от date неизменяем (IMMUTABLE).
+CREATE INDEX IF NOT EXISTS employees_birthday_month_day_idx
+    ON "Employees" ((EXTRACT(MONTH FROM "Birthday") * 100 + EXTRACT(DAY FROM "Birthday")));
@@ -0,0 +1,5 @@
+-- B-tree индексы по "Begin" для search_event и check_task.
+-- DbQueryParser сравнивает сам столбец с полуоткрытым диапазоном ("Begin" >= start AND "Begin" < end)
+-- без приведения к date, поэтому планировщик использует эти индексы и для ORDER BY "Begin".
+CREATE INDEX IF NOT EXISTS event_begin_idx ON "Event" ("Begin");
+CREATE INDEX IF NOT EXISTS task_begin_idx ON "Task" ("Begin");
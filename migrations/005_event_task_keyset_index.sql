@@ -0,0 +1,8 @@
+-- Составные индексы для постраничной выдачи мероприятий и задач.
+-- Порядок (Begin, Id) совпадает с ORDER BY в search_event/check_task, а условие продолжения
+-- ("Begin", Id) > (%s, %s) начинает сканирование сразу после последней показанной строки.
+-- Индексы из migrations/004 покрываются этими и больше не нужны.
+CREATE INDEX IF NOT EXISTS event_begin_id_idx ON "Event" ("Begin", "Event_Id");
+CREATE INDEX IF NOT EXISTS task_begin_id_idx ON "Task" ("Begin", "Task_Id");
+DROP INDEX IF EXISTS event_begin_idx;
+DROP INDEX IF EXISTS task_begin_idx;
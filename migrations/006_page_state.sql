@@ -0,0 +1,8 @@
+-- Общее для всех реплик бота состояние кнопок "следующая страница" (PAGE_STATE_STORE=postgres).
+-- Записи живут PAGE_STATE_TTL секунд; просроченные удаляет сам бот.
+CREATE TABLE IF NOT EXISTS "PageState" (
+    "Token" text PRIMARY KEY,
+    "State" jsonb NOT NULL,
+    "ExpiresAt" timestamptz NOT NULL
+);
+CREATE INDEX IF NOT EXISTS page_state_expires_at_idx ON "PageState" ("ExpiresAt");
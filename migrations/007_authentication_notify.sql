@@ -0,0 +1,5 @@
+-- NOTIFY interesch_data_changed при изменении списка авторизованных пользователей:
+-- бот перечитывает его сразу, без перезапуска. Функция — из migrations/002.
+DROP TRIGGER IF EXISTS interesch_data_changed ON "Authentication";
+CREATE TRIGGER interesch_data_changed AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON "Authentication"
+    FOR EACH STATEMENT EXECUTE FUNCTION interesch_notify_data_changed();
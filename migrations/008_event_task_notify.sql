@@ -0,0 +1,16 @@
+-- NOTIFY interesch_data_changed и для мероприятий и задач: по нему сбрасывается кэш готовых
+-- ответов бота (ANSWER_CACHE_SIZE). Функция — из migrations/002.
+DO $$
+DECLARE
+    table_name text;
+BEGIN
+    FOREACH table_name IN ARRAY ARRAY['Event', 'Task', 'Categories'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS interesch_data_changed ON %I', table_name);
+        EXECUTE format(
+            'CREATE TRIGGER interesch_data_changed AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION interesch_notify_data_changed()',
+            table_name
+        );
+    END LOOP;
+END;
+$$;
@@ -0,0 +1,27 @@
+import asyncio
+
+import httpx
+import pytest
+
+from interesch.ai_request_processor import AsyncAiRequestProcessor
+
+
+@pytest.mark.parametrize("status_response", [
+    httpx.Response(200, text="<html>not json</html>"),
+    httpx.Response(200, json=["model.tar.gz"]),
+    httpx.Response(503),
+])
+def test_watch_model_version_survives_bad_status(status_response):
+    async def scenario():
+        responses = [status_response, httpx.Response(200, json={"model_id": "v2"})]
+        processor = AsyncAiRequestProcessor("http://rasa/model/parse")
+        processor._client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: responses.pop(0)))
+        watcher = asyncio.create_task(processor.watch_model_version(interval=0))
+        while processor.model_version is None:
+            assert not watcher.done()
+            await asyncio.sleep(0)
+        watcher.cancel()
+        await processor.close()
+        assert processor.model_version == "v2"
+
+    asyncio.run(scenario())
@@ -0,0 +1,28 @@
+import asyncio
+
+from interesch.authorization import AuthorizationCache
+
+
+class FakeDatabase:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    async def execute_query(self, query, params=None, fetch=False):
+        self.queries.append(query)
+        return self.rows
+
+
+def test_refresh_reads_telegram_id_column_by_name():
+    db = FakeDatabase([(101,), (102,)])
+    cache = AuthorizationCache()
+    assert asyncio.run(cache.refresh(db))
+    assert db.queries == ['SELECT "TelegramId" FROM "Authentication"']
+    assert 101 in cache and 103 not in cache
+
+
+def test_refresh_keeps_previous_ids_on_error():
+    cache = AuthorizationCache(id_column="tg_id")
+    asyncio.run(cache.refresh(FakeDatabase([(101,)])))
+    assert not asyncio.run(cache.refresh(FakeDatabase(None)))
+    assert 101 in cache
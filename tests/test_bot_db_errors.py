@@ -0,0 +1,34 @@
+import asyncio
+
+import psycopg2
+import pytest
+
+import interesch.__main__ as bot
+
+
+def ai_response(intent: str, entities: list[dict]) -> dict:
+    return {"intent": {"name": intent}, "entities": entities}
+
+
+@pytest.fixture
+def unavailable_db(monkeypatch):
+    async def stream_query(*args, **kwargs):
+        raise psycopg2.OperationalError("connection refused")
+        yield
+
+    async def execute_query(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(bot.db, "stream_query", stream_query)
+    monkeypatch.setattr(bot.db, "execute_query", execute_query)
+
+
+@pytest.mark.parametrize("response", [
+    ai_response("search_event", [{"entity": "date", "value": "на этой неделе"}]),
+    ai_response("check_task", [{"entity": "name", "value": "Волков"}]),
+    ai_response("search_person", [{"entity": "name", "value": "Волков"}]),
+])
+def test_db_error_gives_same_answer_on_streamed_and_plain_paths(unavailable_db, response):
+    assert asyncio.run(bot.build_answer(response, log_payload=False)) is bot.DB_ERROR_ANSWER
+    if bot.answer_cache is not None:
+        assert len(bot.answer_cache.cache) == 0
@@ -0,0 +1,73 @@
+import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from interesch import database
+from interesch.db_response_parser import DbResponseParser
+from interesch.query_cache import QueryResultCache
+from interesch.rows import BirthdayRecord
+
+COLUMNS = ["surname", "name", "father", "birthday", "department_name"]
+ROWS = [("Волков", "Андрей", "Петрович", datetime.date(1990, 6, 1), "Отдел разработки")]
+
+
+class FakeCursor:
+    def __init__(self):
+        self.executed = 0
+        self.description = [SimpleNamespace(name=column) for column in COLUMNS]
+
+    def execute(self, query, params=None):
+        self.executed += 1
+
+    def fetchall(self):
+        return list(ROWS)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    closed = 0
+
+    def __init__(self):
+        self.fake_cursor = FakeCursor()
+
+    def cursor(self, cursor_factory=None):
+        return self.fake_cursor
+
+    def poll(self):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def connection(monkeypatch):
+    fake = FakeConnection()
+    monkeypatch.setattr(database.psycopg2, "connect", lambda **kwargs: fake)
+    return fake
+
+
+def test_sync_database_returns_records(connection):
+    db = database.Database("db", "user", "password")
+    rows = db.execute_query('SELECT 1 FROM "Employees"', fetch=True, record_type=BirthdayRecord)
+    assert rows == [BirthdayRecord(*ROWS[0])]
+    assert DbResponseParser.parse_into_message(rows).startswith("<b>Найдены следующие дни рождения:</b>")
+
+
+def test_sync_database_caches_records_by_record_type(connection):
+    db = database.Database("db", "user", "password", result_cache=QueryResultCache())
+    query = 'SELECT 1 FROM "Employees"'
+    assert db.execute_query(query, fetch=True, record_type=BirthdayRecord) == [BirthdayRecord(*ROWS[0])]
+    assert db.execute_query(query, fetch=True, record_type=BirthdayRecord) == [BirthdayRecord(*ROWS[0])]
+    assert connection.fake_cursor.executed == 1
+    assert db.execute_query(query, fetch=True) == ROWS
+    assert connection.fake_cursor.executed == 2
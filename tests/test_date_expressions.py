@@ -0,0 +1,61 @@
+"""
+Разбор выражений дат по токенам против прежнего каскада проверок подстрок
+(эталонные функции — из benchmarks/date_expressions.py).
+"""
+import datetime
+import logging
+import random
+
+import pytest
+
+from benchmarks.date_expressions import (get_month_day_from_specifier_baseline, parse_relative_date_entity_baseline,
+                                         random_expression)
+from interesch.date_expressions import DateRange, MonthDayRange, parse_date_range, parse_month_day_range
+
+FIRST_DAY = datetime.date(2020, 1, 1)
+
+
+@pytest.fixture(autouse=True)
+def quiet_warnings():
+    logging.disable(logging.WARNING)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_baseline_on_random_expressions(seed):
+    rng = random.Random(seed)
+    for _ in range(2000):
+        expression = random_expression(rng)
+        today = FIRST_DAY + datetime.timedelta(days=rng.randrange(365 * 10))
+        actual = [tuple(date_range) for date_range in parse_date_range(expression, today)]
+        try:
+            assert actual == parse_relative_date_entity_baseline(expression, today), (expression, today)
+        except OverflowError:
+            # Прежняя реализация падала на слишком длинном числе дня; новая берёт весь месяц.
+            assert len(actual) == 1, (expression, today)
+        actual = [tuple(month_day_range) for month_day_range in parse_month_day_range(expression, today)]
+        assert actual == get_month_day_from_specifier_baseline(expression, today), (expression, today)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("завтра", (DateRange(datetime.date(2024, 5, 16), datetime.date(2024, 5, 17)),)),
+    ("На следующей неделе", (DateRange(datetime.date(2024, 5, 20), datetime.date(2024, 5, 27)),)),
+    ("в прошлом квартале", (DateRange(datetime.date(2024, 1, 1), datetime.date(2024, 4, 1)),)),
+    ("20 мая", (DateRange(datetime.date(2024, 5, 20), datetime.date(2024, 5, 21)),)),
+    ("в следующем году", (DateRange(datetime.date(2025, 1, 1), datetime.date(2026, 1, 1)),)),
+    ("на неделе", ()),
+    ("что-то непонятное", ()),
+])
+def test_parse_date_range(value, expected):
+    assert parse_date_range(value, datetime.date(2024, 5, 15)) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("вчера", (MonthDayRange(514, 514),)),
+    ("в июне", (MonthDayRange(601, 631),)),
+    ("зимой", (MonthDayRange(1201, 1231), MonthDayRange(101, 229))),
+    ("на этой неделе", ()),
+])
+def test_parse_month_day_range(value, expected):
+    assert parse_month_day_range(value, datetime.date(2024, 5, 15)) == expected
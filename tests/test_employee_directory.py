@@ -0,0 +1,38 @@
+import datetime
+import random
+
+import pytest
+
+from interesch.employee_directory import EmployeeDirectory
+
+NAMES = ["Андрей", "Алексей", "Иван", "Мария", "Анна", "Елена"]
+SURNAMES = ["Волков", "Волкова", "Иванов", "Смирнова", "Лебедев", "Кузнецов"]
+
+
+@pytest.fixture(scope="module")
+def directory():
+    rng = random.Random(7)
+    rows = [(i, rng.choice(SURNAMES) + rng.choice(["", "ский", str(i % 13)]), rng.choice(NAMES), None,
+             datetime.date(1990, 1 + i % 12, 1 + i % 28), None, None, None, None, None, None) for i in range(300)]
+    snapshot = EmployeeDirectory()
+    snapshot.load(rows)
+    return snapshot
+
+
+def scan(directory, part1: str, part2: str) -> set[int]:
+    if part1 == part2:
+        return {id(record) for record in directory._records
+                if part1 in record.name_lower or part1 in record.surname_lower}
+    return {id(record) for record in directory._records
+            if (part1 in record.name_lower and part2 in record.surname_lower)
+            or (part2 in record.name_lower and part1 in record.surname_lower)}
+
+
+@pytest.mark.parametrize("value", ["волков", "волкова", "ов", "а", "ан", "кий", "иванов андрей", "андрей иванов",
+                                   "мария ов", "смирнова7", "петров", "ан ов"])
+def test_match_name_agrees_with_full_scan(directory, value):
+    part1, _, part2 = value.partition(" ")
+    part2 = part2 or part1
+    matched = directory._match_name(value)
+    assert {id(record) for record in matched} == scan(directory, part1, part2)
+    assert len(matched) == len({id(record) for record in matched})
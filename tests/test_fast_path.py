@@ -0,0 +1,50 @@
+import logging
+
+import pytest
+
+from interesch.fast_path import FastPathClassifier
+
+
+class Directory:
+    def is_known_name(self, lemma: str) -> bool:
+        return lemma in {"волков", "андрей", "алексей"}
+
+
+@pytest.fixture(autouse=True)
+def quiet_warnings():
+    logging.disable(logging.WARNING)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+@pytest.mark.parametrize("text, intent, value", [
+    ("Найди Волкова Андрея", "search_person", "Волкова Андрея"),
+    ("Какие мероприятия на этой неделе?", "search_event", "на этой неделе"),
+    ("У кого день рождения в июне?", "find_birthday", "в июне"),
+    ("Задачи Алексея", "check_task", "Алексея"),
+])
+def test_help_examples(text, intent, value):
+    response = FastPathClassifier(Directory()).classify(text)
+    assert response["intent"]["name"] == intent
+    assert [entity["value"] for entity in response["entities"]] == [value]
+
+
+@pytest.mark.parametrize("text", ["Какие мероприятия на неделе?", "Найди Иванова Петра"])
+def test_unparsed_values_go_to_rasa(text):
+    assert FastPathClassifier(Directory()).classify(text) is None
+
+
+def test_fast_path_reuses_directory_lemmas():
+    import datetime
+
+    from interesch.employee_directory import EmployeeDirectory
+    from interesch.text_normalizer import lemmatize_word
+
+    lemmatize_word.cache_clear()
+    directory = EmployeeDirectory()
+    directory.load([(1, "Волков", "Андрей", "Петрович", datetime.date(1990, 6, 1), None,
+                     None, None, None, None, None)])
+    assert lemmatize_word.cache_info().misses == 2
+    response = FastPathClassifier(directory).classify("Найди Волков Андрей")
+    assert response["intent"]["name"] == "search_person"
+    assert lemmatize_word.cache_info()[:2] == (2, 2)
@@ -0,0 +1,28 @@
+import pytest
+
+from interesch.db_response_parser import DbResponseParser
+from interesch.message_renderer import HTML_TOKEN_PATTERN, truncate_html
+
+ENTRY = "<b>Задача &amp; отчёт</b> (Проект: X)\n  <i>Описание:</i> " + "слово " * 50 + "&lt;конец&gt; <i>x</i>"
+
+
+@pytest.mark.parametrize("limit", range(10, len(ENTRY) + 2))
+def test_truncate_html_keeps_markup_valid(limit):
+    result = truncate_html(ENTRY, limit)
+    assert len(result) <= limit
+    text = HTML_TOKEN_PATTERN.sub("", result)
+    assert "<" not in text and "&" not in text
+    for tag in ("b", "i"):
+        assert result.count(f"<{tag}>") == result.count(f"</{tag}>")
+
+
+def test_truncate_html_cuts_before_entity():
+    assert truncate_html(ENTRY, 20) == "<b>Задача ...</b>"
+    assert truncate_html(ENTRY, len(ENTRY)) == ENTRY
+
+
+def test_split_messages_truncates_long_entry_safely():
+    messages = DbResponseParser._split_messages("<b>Заголовок</b>", [ENTRY, "короткая"], "\n\n", 100)
+    assert all(len(message) <= 100 for message in messages)
+    assert messages[1].endswith("слов...")
+    assert messages[1].count("<i>") == messages[1].count("</i>")
@@ -0,0 +1,37 @@
+import pytest
+
+from interesch.metrics import StageMetrics, stage, track_request
+
+
+def test_quantile_interpolates_within_bucket():
+    stage_metrics = StageMetrics(buckets=(0.01, 0.02, 0.04))
+    for seconds in (0.005, 0.015, 0.015, 0.03):
+        stage_metrics.observe("db", "search_person", seconds)
+    stage_metrics.observe("db", "check_task", 0.03)
+    assert stage_metrics.totals("db") == (5, pytest.approx(0.095))
+    assert stage_metrics.totals("db", "check_task") == (1, pytest.approx(0.03))
+    assert stage_metrics.quantile(0.5, "db", "search_person") == pytest.approx(0.015)
+    assert stage_metrics.quantile(1.0, "db") == pytest.approx(0.04)
+    assert stage_metrics.quantile(0.5, "render") is None
+    assert stage_metrics.intents("db") == ["check_task", "search_person"]
+
+
+def test_clear_replaces_buckets():
+    stage_metrics = StageMetrics(buckets=(1.0,))
+    stage_metrics.observe("db", None, 0.5)
+    stage_metrics.clear((0.001, 0.01))
+    assert stage_metrics.totals("db") == (0, 0.0)
+    stage_metrics.observe("db", None, 0.005)
+    assert stage_metrics.quantile(0.5, "db") == pytest.approx(0.0055)
+
+
+def test_request_stages_are_recorded_with_intent(monkeypatch):
+    from interesch import metrics as metrics_module
+    stage_metrics = StageMetrics()
+    monkeypatch.setattr(metrics_module, "metrics", stage_metrics)
+    with track_request() as timings:
+        with stage("nlu"):
+            pass
+        timings.intent = "search_event"
+    assert stage_metrics.totals("nlu", "search_event")[0] == 1
+    assert stage_metrics.totals("total", "search_event")[0] == 1
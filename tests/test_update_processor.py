@@ -0,0 +1,55 @@
+import asyncio
+from types import SimpleNamespace
+
+from interesch.update_processor import ChatOrderedUpdateProcessor
+
+
+def update(chat_id: int):
+    return SimpleNamespace(effective_chat=SimpleNamespace(id=chat_id))
+
+
+def test_burst_from_one_chat_does_not_stall_other_chats():
+    async def scenario():
+        dropped = []
+
+        async def on_dropped(item):
+            dropped.append(item.effective_chat.id)
+
+        processor = ChatOrderedUpdateProcessor(workers=2, max_pending=4, max_pending_per_chat=2,
+                                               on_dropped=on_dropped)
+        release = asyncio.Event()
+        served = []
+
+        async def handle(chat_id: int, index: int):
+            served.append((chat_id, index))
+            if chat_id == 1:
+                await release.wait()
+
+        burst = [asyncio.create_task(processor.process_update(update(1), handle(1, i))) for i in range(10)]
+        await asyncio.sleep(0)
+        other = asyncio.create_task(processor.process_update(update(2), handle(2, 0)))
+        await asyncio.wait_for(other, timeout=1)
+        assert (2, 0) in served
+        assert dropped == [1] * 8
+
+        release.set()
+        await asyncio.gather(*burst)
+        assert [index for chat_id, index in served if chat_id == 1] == [0, 1]
+        assert processor.dropped == 8
+
+    asyncio.run(scenario())
+
+
+def test_updates_of_one_chat_keep_order():
+    async def scenario():
+        processor = ChatOrderedUpdateProcessor(workers=4, max_pending_per_chat=5)
+        served = []
+
+        async def handle(index: int):
+            await asyncio.sleep(0.001 * (5 - index))
+            served.append(index)
+
+        await asyncio.gather(*(processor.process_update(update(1), handle(i)) for i in range(5)))
+        assert served == list(range(5))
+
+    asyncio.run(scenario())